@@ -1,28 +1,166 @@
 """Audit logging for AI Shell commands."""
 
+import atexit
+import contextlib
 import json
 import os
+import queue
+import sys
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+from . import jsonutil
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows has no flock
+    fcntl = None  # type: ignore[assignment]
+
+
+# Block size used when scanning the audit log backwards for recent entries
+READ_BLOCK_SIZE = 8192
+
+# Number of entries between saves of the running statistics
+STATS_SAVE_INTERVAL = 32
+
+# Maximum number of queued entries coalesced into a single write
+MAX_BATCH_SIZE = 256
+
+# Seconds to wait for the background writer when flushing or closing
+FLUSH_TIMEOUT = 2.0
+
+# Seconds between checks that another process has not rotated the log away
+# from our descriptor; checking costs a stat() and an fstat()
+REOPEN_CHECK_INTERVAL = 1.0
+
+# Queue marker telling the background writer to exit
+_STOP = object()
+
+# A serialized log line plus the fields the running statistics need:
+# (line, provider, approved)
+_Record = Tuple[bytes, Optional[str], Optional[bool]]
+
+
+def _field_prefixes(*names: str) -> Tuple[bytes, ...]:
+    """Pre-encode the ``{"name":`` / ``,"name":`` lead-in of each field."""
+    return tuple(
+        (b"{" if i == 0 else b",") + jsonutil.dumps(name) + b":"
+        for i, name in enumerate(names)
+    )
+
+
+_SUGGESTION_PREFIXES = _field_prefixes(
+    "timestamp", "goal", "command", "cwd", "provider", "approved", "exit_code", "risk_score"
+)
+_ERROR_PREFIXES = _field_prefixes("timestamp", "goal", "error", "cwd", "provider")
+
+
+def _encode_value(value: Any) -> bytes:
+    """Encode a single field value as JSON."""
+    if value is None:
+        return b"null"
+    if value is True:
+        return b"true"
+    if value is False:
+        return b"false"
+    if type(value) is int:
+        return b"%d" % value
+    # Strings need escaping; anything unusual goes through the full encoder
+    try:
+        return jsonutil.dumps(value)
+    except TypeError:
+        # orjson rejects strings with lone surrogates, e.g. a cwd whose name
+        # is not valid UTF-8; escaping everything to ASCII keeps them
+        return json.dumps(value).encode("ascii")
+
+
+def _pack_line(prefixes: Tuple[bytes, ...], values: Tuple[Any, ...]) -> bytes:
+    """Build one JSON log line from pre-encoded keys and field values."""
+    parts = []
+    for prefix, value in zip(prefixes, values, strict=True):
+        parts.append(prefix)
+        parts.append(_encode_value(value))
+    parts.append(b"}\n")
+    return b"".join(parts)
+
+
+def _timestamp() -> str:
+    """Current UTC time in the log's ISO 8601 format."""
+    return datetime.utcnow().isoformat() + "Z"
+
+
+def _empty_counters() -> Dict[str, Any]:
+    """Create a zeroed set of running audit statistics."""
+    return {
+        "total_entries": 0,
+        "approved_count": 0,
+        "total_suggestions": 0,
+        "providers_used": set(),
+    }
+
+
+def _merge_counters(base: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    """Add the counters in ``delta`` on top of ``base``."""
+    return {
+        "total_entries": base["total_entries"] + delta["total_entries"],
+        "approved_count": base["approved_count"] + delta["approved_count"],
+        "total_suggestions": base["total_suggestions"] + delta["total_suggestions"],
+        "providers_used": base["providers_used"] | delta["providers_used"],
+    }
 
 
 class AuditLogger:
     """Handles audit logging of AI Shell commands and interactions."""
     
-    def __init__(self, log_path: str, max_size_mb: int = 5):
+    def __init__(self, log_path: str, max_size_mb: int = 5, sync: bool = False):
         """
         Initialize audit logger.
         
         Args:
             log_path: Path to the audit log file
             max_size_mb: Maximum log file size in MB before rotation
+            sync: Write entries on the calling thread instead of handing
+                them to a background writer
         """
         self.log_path = Path(log_path).expanduser()
         self.max_size_bytes = max_size_mb * 1024 * 1024
+        self.sync = sync
         
         # Ensure log directory exists
         self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        # Long-lived O_APPEND descriptor, opened on first write. Each batch
+        # goes out in one write(), which the kernel appends atomically, so
+        # concurrent `ai` processes never interleave partial lines.
+        self._fd: Optional[int] = None
+        self._next_reopen_check = 0.0
+        
+        # Approximate log size, so rotation checks don't need a stat() per entry
+        try:
+            self._bytes_written = self.log_path.stat().st_size
+        except (OSError, IOError):
+            self._bytes_written = 0
+        
+        # Running statistics, persisted next to the log. Other processes
+        # append to the same log, so only our own increments are kept in
+        # ``_stats_delta`` and merged into the file when saving.
+        self.stats_path = self.log_path.with_name(self.log_path.stem + ".stats.json")
+        # Saving replaces the stats file, so writers lock a separate file
+        self._stats_lock_path = self.log_path.with_name(self.log_path.stem + ".stats.lock")
+        self._stats = self._load_stats()
+        self._stats_delta = _empty_counters()
+        
+        # Guards the file handle and counters, which the writer thread shares
+        self._lock = threading.Lock()
+        
+        # Background writer, started on the first logged entry
+        self._queue: "queue.SimpleQueue[Any]" = queue.SimpleQueue()
+        self._writer: Optional[threading.Thread] = None
+        
+        atexit.register(self.close)
     
     def log_suggestion(
         self,
@@ -46,19 +184,11 @@ class AuditLogger:
             exit_code: Exit code if command was executed
             risk_score: Safety risk score
         """
-        entry = {
-            "timestamp": datetime.utcnow().isoformat() + "Z",
-            "goal": goal,
-            "command": command,
-            "cwd": cwd,
-            "provider": provider,
-            "approved": approved,
-            "exit_code": exit_code,
-            "risk_score": risk_score,
-        }
-        
-        self._append_entry(entry)
-        self._rotate_if_needed()
+        line = _pack_line(
+            _SUGGESTION_PREFIXES,
+            (_timestamp(), goal, command, cwd, provider, approved, exit_code, risk_score),
+        )
+        self._submit((line, provider, approved))
     
     def log_error(
         self,
@@ -76,40 +206,330 @@ class AuditLogger:
             cwd: Current working directory
             provider: AI provider used (if any)
         """
-        entry = {
-            "timestamp": datetime.utcnow().isoformat() + "Z",
-            "goal": goal,
-            "error": error,
-            "cwd": cwd,
-            "provider": provider,
-        }
+        line = _pack_line(_ERROR_PREFIXES, (_timestamp(), goal, error, cwd, provider))
+        self._submit((line, provider, None))
+    
+    def flush(self) -> None:
+        """Wait until entries queued so far have been written."""
+        self._wait_for_writer()
+    
+    def close(self) -> None:
+        """Stop the background writer, save statistics and close the log."""
+        writer = self._writer
+        if writer is not None:
+            self._queue.put(_STOP)
+            writer.join(FLUSH_TIMEOUT)
+            self._writer = None
+        
+        with self._lock:
+            self._save_stats()
+            self._close_file()
+    
+    def _submit(self, record: _Record) -> None:
+        """Hand a record to the background writer, or write it directly."""
+        if not self.sync and self._start_writer():
+            self._queue.put(record)
+            return
+        
+        with self._lock:
+            self._append_records([record])
+            self._rotate_if_needed()
+    
+    def _start_writer(self) -> bool:
+        """Start the background writer if needed; False if it cannot run."""
+        writer = self._writer
+        if writer is not None and writer.is_alive():
+            return True
+        
+        with self._lock:
+            if self._writer is None or not self._writer.is_alive():
+                thread = threading.Thread(
+                    target=self._drain, name="ai-shell-audit", daemon=True
+                )
+                try:
+                    thread.start()
+                except RuntimeError:
+                    # e.g. at interpreter shutdown
+                    return False
+                self._writer = thread
+        return True
+    
+    def _wait_for_writer(self) -> None:
+        """Block until entries queued so far have been written."""
+        writer = self._writer
+        if writer is None or not writer.is_alive():
+            return
         
-        self._append_entry(entry)
-        self._rotate_if_needed()
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(FLUSH_TIMEOUT)
     
-    def _append_entry(self, entry: Dict[str, Any]) -> None:
-        """Append an entry to the audit log."""
+    def _drain(self) -> None:
+        """Background writer loop: write queued entries in batches."""
+        while True:
+            item = self._queue.get()
+            batch: List[_Record] = []
+            waiters: List[threading.Event] = []
+            stop = False
+            
+            # Greedily take whatever else is already queued
+            while True:
+                if item is _STOP:
+                    stop = True
+                    break
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                if len(batch) >= MAX_BATCH_SIZE:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            
+            with self._lock:
+                if batch:
+                    self._append_records(batch)
+                    self._rotate_if_needed()
+            
+            for done in waiters:
+                done.set()
+            
+            if stop:
+                return
+    
+    def _close_file(self) -> None:
+        """Close the log descriptor. Callers hold ``_lock``."""
+        if self._fd is None:
+            return
         try:
-            with open(self.log_path, "a", encoding="utf-8") as f:
-                json.dump(entry, f, separators=(",", ":"))
-                f.write("\n")
+            os.close(self._fd)
+        except (OSError, IOError) as e:
+            print(f"Warning: Could not close audit log: {e}", file=sys.stderr)  # noqa: T201
+        finally:
+            self._fd = None
+    
+    def _reopen_if_replaced(self) -> None:
+        """
+        Drop the descriptor if the log was rotated or removed under us.
+        
+        Another process may have renamed the file we hold open, in which
+        case our writes would keep landing in the backup. This is checked
+        at most every REOPEN_CHECK_INTERVAL seconds, so entries written
+        within that window of a rotation may still go to the backup.
+        """
+        if self._fd is None:
+            return
+        
+        now = time.monotonic()
+        if now < self._next_reopen_check:
+            return
+        self._next_reopen_check = now + REOPEN_CHECK_INTERVAL
+        
+        try:
+            current = os.stat(self.log_path)
+        except FileNotFoundError:
+            self._close_file()
+            self._bytes_written = 0
+            return
+        
+        opened = os.fstat(self._fd)
+        if (opened.st_dev, opened.st_ino) != (current.st_dev, current.st_ino):
+            self._close_file()
+            self._bytes_written = current.st_size
+    
+    def _append_records(self, records: List[_Record]) -> None:
+        """Append records to the audit log with a single write."""
+        buf = b"".join(line for line, _, _ in records)
+        try:
+            self._reopen_if_replaced()
+            if self._fd is None:
+                self._fd = os.open(
+                    self.log_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644
+                )
+                self._next_reopen_check = time.monotonic() + REOPEN_CHECK_INTERVAL
+            
+            # os.write may accept fewer bytes than given; keep going until done
+            view = memoryview(buf)
+            while view:
+                view = view[os.write(self._fd, view):]
         except (OSError, IOError) as e:
             # If we can't write to the log, print to stderr but don't fail
-            print(f"Warning: Could not write to audit log: {e}", file=__import__("sys").stderr)
+            print(f"Warning: Could not write to audit log: {e}", file=sys.stderr)  # noqa: T201
+            return
+        
+        self._bytes_written += len(buf)
+        for _, provider, approved in records:
+            self._count_entry(provider, approved)
     
-    def _rotate_if_needed(self) -> None:
-        """Rotate log file if it exceeds maximum size."""
+    def _count_entry(self, provider: Optional[str], approved: Optional[bool]) -> None:
+        """Update the running statistics for a newly written entry."""
+        delta = self._stats_delta
+        delta["total_entries"] += 1
+        
+        if provider:
+            delta["providers_used"].add(provider)
+        
+        if approved is not None:
+            delta["total_suggestions"] += 1
+            if approved:
+                delta["approved_count"] += 1
+        
+        if delta["total_entries"] >= STATS_SAVE_INTERVAL:
+            self._save_stats()
+    
+    @contextlib.contextmanager
+    def _stats_file_lock(self) -> Iterator[None]:
+        """Hold an exclusive lock across a read-modify-write of the stats file."""
+        if fcntl is None:
+            yield
+            return
+        
+        fd = os.open(self._stats_lock_path, os.O_RDWR | os.O_CREAT, 0o644)
         try:
-            if self.log_path.exists() and self.log_path.stat().st_size > self.max_size_bytes:
-                backup_path = self.log_path.with_suffix(self.log_path.suffix + ".1")
-                
-                # Remove old backup if it exists
-                if backup_path.exists():
-                    backup_path.unlink()
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            # Closing the descriptor releases the lock
+            os.close(fd)
+    
+    def _log_size(self) -> int:
+        """Get the current size of the log, 0 if it does not exist."""
+        try:
+            return self.log_path.stat().st_size
+        except (OSError, IOError):
+            return 0
+    
+    def _read_stats_file(self) -> Optional[Dict[str, Any]]:
+        """
+        Read persisted statistics, or None if missing or unreadable.
+        
+        Besides the counters, ``log_size`` holds the size of the log when
+        they were saved (0 for files written before it was recorded).
+        """
+        try:
+            data = jsonutil.loads(self.stats_path.read_bytes())
+            return {
+                "total_entries": int(data["total_entries"]),
+                "approved_count": int(data["approved_count"]),
+                "total_suggestions": int(data["total_suggestions"]),
+                "providers_used": set(data["providers_used"]),
+                "log_size": int(data.get("log_size", 0)),
+            }
+        except (OSError, IOError, jsonutil.JSONDecodeError, KeyError, TypeError, ValueError):
+            return None
+    
+    def _write_stats_file(self, stats: Dict[str, Any]) -> None:
+        """Atomically replace the persisted statistics."""
+        data = {
+            "total_entries": stats["total_entries"],
+            "approved_count": stats["approved_count"],
+            "total_suggestions": stats["total_suggestions"],
+            "providers_used": sorted(stats["providers_used"]),
+            "log_size": self._log_size(),
+        }
+        tmp_path = self.stats_path.with_name(f"{self.stats_path.name}.{os.getpid()}.tmp")
+        tmp_path.write_bytes(jsonutil.dumps(data))
+        os.replace(tmp_path, self.stats_path)
+    
+    def _load_stats(self) -> Dict[str, Any]:
+        """Load persisted statistics, rebuilding them from the log if needed."""
+        try:
+            with self._stats_file_lock():
+                stats = self._read_stats_file()
                 
-                # Move current log to backup
-                self.log_path.rename(backup_path)
+                # A log that is gone or shorter than when the stats were saved
+                # was deleted or truncated by hand, so the stats are stale
+                if stats is not None and stats["log_size"] <= self._log_size():
+                    return stats
                 
+                # Missing (first run or upgrade) or stale: scan the log once
+                rebuilt = self._scan_stats()
+                if stats is not None or rebuilt["total_entries"]:
+                    self._write_stats_file(rebuilt)
+                return rebuilt
+        except (OSError, IOError):
+            return self._scan_stats()
+    
+    def _save_stats(self) -> None:
+        """Merge our pending increments into the persisted statistics."""
+        if not self._stats_delta["total_entries"]:
+            return
+        
+        try:
+            # Lock so two processes saving at once cannot both start from the
+            # same file and drop one's increments
+            with self._stats_file_lock():
+                # Start from the file so increments saved by other processes survive
+                base = self._read_stats_file() or self._stats
+                stats = _merge_counters(base, self._stats_delta)
+                self._write_stats_file(stats)
+        except (OSError, IOError):
+            # Keep the increments and retry on the next save
+            return
+        
+        self._stats = stats
+        self._stats_delta = _empty_counters()
+    
+    def _scan_stats(self) -> Dict[str, Any]:
+        """Compute statistics by parsing every entry of the audit log."""
+        stats = _empty_counters()
+        
+        try:
+            with open(self.log_path, "rb") as f:
+                for line in f:
+                    try:
+                        entry = jsonutil.loads(line)
+                    except jsonutil.JSONDecodeError:
+                        continue
+                    
+                    stats["total_entries"] += 1
+                    
+                    if entry.get("provider"):
+                        stats["providers_used"].add(entry["provider"])
+                    
+                    if entry.get("approved") is not None:
+                        stats["total_suggestions"] += 1
+                        if entry["approved"]:
+                            stats["approved_count"] += 1
+                            
+        except (OSError, IOError):
+            pass
+        
+        return stats
+    
+    def _rotate_if_needed(self) -> None:
+        """Rotate log file if it exceeds maximum size."""
+        if self._bytes_written <= self.max_size_bytes:
+            return
+        
+        try:
+            # Confirm against the file itself, other processes append to it too
+            size = self.log_path.stat().st_size
+            if size <= self.max_size_bytes:
+                self._bytes_written = size
+                return
+            
+            backup_path = self.log_path.with_suffix(self.log_path.suffix + ".1")
+            
+            # Release the handle so the next write reopens a fresh file
+            self._close_file()
+            
+            # Remove old backup if it exists
+            if backup_path.exists():
+                backup_path.unlink()
+            
+            # Move current log to backup
+            self.log_path.rename(backup_path)
+            self._bytes_written = 0
+            
+            # Statistics describe the current log only
+            self._stats = _empty_counters()
+            self._stats_delta = _empty_counters()
+            with self._stats_file_lock():
+                self._write_stats_file(self._stats)
+            
         except (OSError, IOError):
             # If rotation fails, continue without failing
             pass
@@ -125,20 +545,18 @@ class AuditLogger:
             List of recent log entries
         """
         entries = []
+        self.flush()
         
         try:
             if not self.log_path.exists():
                 return entries
             
-            with open(self.log_path, "r", encoding="utf-8") as f:
-                lines = f.readlines()
-                
             # Get last N lines
-            for line in lines[-limit:]:
+            for line in self._read_last_lines(limit):
                 try:
-                    entry = json.loads(line.strip())
+                    entry = jsonutil.loads(line)
                     entries.append(entry)
-                except json.JSONDecodeError:
+                except jsonutil.JSONDecodeError:
                     continue
                     
         except (OSError, IOError):
@@ -146,6 +564,44 @@ class AuditLogger:
         
         return entries
     
+    def _read_last_lines(self, limit: int) -> List[bytes]:
+        """
+        Read the last lines of the audit log without loading the whole file.
+        
+        Scans backwards from the end of the file in fixed-size blocks until
+        enough newlines have been seen, like ``tail -n``.
+        
+        Args:
+            limit: Number of lines to return
+            
+        Returns:
+            Up to ``limit`` raw lines, oldest first
+        """
+        if limit <= 0:
+            return []
+        
+        blocks: List[bytes] = []
+        newlines = 0
+        
+        with open(self.log_path, "rb") as f:
+            offset = f.seek(0, os.SEEK_END)
+            
+            # One extra newline guarantees the first kept line is complete
+            while offset > 0 and newlines <= limit:
+                size = min(READ_BLOCK_SIZE, offset)
+                offset -= size
+                f.seek(offset)
+                block = f.read(size)
+                blocks.append(block)
+                newlines += block.count(b"\n")
+        
+        lines = b"".join(reversed(blocks)).splitlines()
+        if offset > 0:
+            # The first line may have been cut in the middle
+            lines = lines[1:]
+        
+        return lines[-limit:]
+    
     def get_stats(self) -> Dict[str, Any]:
         """
         Get statistics about audit log usage.
@@ -153,44 +609,25 @@ class AuditLogger:
         Returns:
             Dictionary with statistics
         """
+        self.flush()
+        
+        # Pick up entries saved by other processes since we last looked
+        with self._lock:
+            base = self._read_stats_file() or self._stats
+            counters = _merge_counters(base, self._stats_delta)
+        
         stats = {
-            "total_entries": 0,
+            "total_entries": counters["total_entries"],
             "file_size_bytes": 0,
-            "providers_used": set(),
+            "providers_used": sorted(counters["providers_used"]),
             "approval_rate": 0.0,
         }
         
+        if counters["total_suggestions"] > 0:
+            stats["approval_rate"] = counters["approved_count"] / counters["total_suggestions"]
+        
         try:
-            if not self.log_path.exists():
-                return stats
-            
             stats["file_size_bytes"] = self.log_path.stat().st_size
-            
-            approved_count = 0
-            total_suggestions = 0
-            
-            with open(self.log_path, "r", encoding="utf-8") as f:
-                for line in f:
-                    try:
-                        entry = json.loads(line.strip())
-                        stats["total_entries"] += 1
-                        
-                        if "provider" in entry and entry["provider"]:
-                            stats["providers_used"].add(entry["provider"])
-                        
-                        if "approved" in entry and entry["approved"] is not None:
-                            total_suggestions += 1
-                            if entry["approved"]:
-                                approved_count += 1
-                                
-                    except json.JSONDecodeError:
-                        continue
-            
-            if total_suggestions > 0:
-                stats["approval_rate"] = approved_count / total_suggestions
-            
-            stats["providers_used"] = list(stats["providers_used"])
-            
         except (OSError, IOError):
             pass
         
@@ -0,0 +1,57 @@
+"""Small in-memory caches."""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Generic, Hashable, Optional, Tuple, TypeVar
+
+
+V = TypeVar("V")
+
+
+class TTLCache(Generic[V]):
+    """
+    Small thread-safe LRU cache whose entries expire a fixed time after
+    being stored.
+    """
+    
+    def __init__(self, maxsize: int, ttl: float):
+        """
+        Initialize the cache.
+        
+        Args:
+            maxsize: Maximum number of entries kept
+            ttl: Seconds an entry stays valid after being stored
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, V]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: Hashable) -> Optional[V]:
+        """Get a live entry, or None if it is missing or expired."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            
+            self._data.move_to_end(key)
+            return value
+    
+    def set(self, key: Hashable, value: V) -> None:
+        """Store an entry, evicting the least recently used ones when full."""
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+    
+    def clear(self) -> None:
+        """Drop every entry."""
+        with self._lock:
+            self._data.clear()
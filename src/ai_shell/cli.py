@@ -1,17 +1,21 @@
 """CLI interface for AI Shell."""
 
+import atexit
+import functools
 import os
 import sys
 import subprocess
 import time
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
-import httpx
 import typer
 
 from .config import config
-from .safety import Safety
-from .audit import AuditLogger
+
+if TYPE_CHECKING:
+    import httpx
+    
+    from .audit import AuditLogger
 
 
 app = typer.Typer(
@@ -20,26 +24,48 @@ app = typer.Typer(
     no_args_is_help=True,
 )
 
-safety = Safety()
-audit_logger = AuditLogger(str(config.expanded_log_path))
+
+# Heavier dependencies are imported on first use so that `ai --help` and
+# shell completion only pay for typer.
+@functools.cache
+def _audit() -> "AuditLogger":
+    """Get the shared audit logger."""
+    from .audit import AuditLogger
+    return AuditLogger(str(config.expanded_log_path))
+
+
+@functools.cache
+def _http_client() -> "httpx.Client":
+    """Get the shared client, so daemon calls reuse one keep-alive connection."""
+    import httpx
+    
+    socket_path = config.expanded_socket_path
+    if socket_path.exists():
+        # Talk to the daemon over its UNIX socket, skipping the TCP stack
+        client = httpx.Client(
+            transport=httpx.HTTPTransport(uds=str(socket_path)),
+            base_url="http://localhost",
+            timeout=30.0,
+        )
+    else:
+        client = httpx.Client(base_url=config.server_url, timeout=30.0)
+    
+    atexit.register(client.close)
+    return client
+
+
+# How long to wait for a freshly spawned daemon to answer its health check
+DAEMON_START_TIMEOUT = 5.0
+DAEMON_POLL_INTERVAL = 0.1
 
 
-def ensure_daemon_running() -> bool:
+def _start_daemon() -> bool:
     """
-    Ensure the AI Shell daemon is running.
+    Spawn the daemon in the background.
     
     Returns:
-        True if daemon is running or was started successfully
+        True if the daemon process was started
     """
-    # Check if daemon is already running
-    try:
-        response = httpx.get(f"{config.server_url}/health", timeout=2.0)
-        if response.status_code == 200:
-            return True
-    except httpx.RequestError:
-        pass
-    
-    # Try to start the daemon
     try:
         subprocess.Popen(
             [sys.executable, "-m", "ai_shell.server"],
@@ -47,34 +73,47 @@ def ensure_daemon_running() -> bool:
             stderr=subprocess.DEVNULL,
             start_new_session=True,
         )
-        
-        # Wait a bit for startup
-        time.sleep(2)
-        
-        # Check if it's running now
+        return True
+    except Exception:
+        return False
+
+
+def _wait_for_daemon(timeout: float = DAEMON_START_TIMEOUT) -> bool:
+    """
+    Poll the daemon's health check until it answers or the timeout expires.
+    
+    Returns:
+        True if the daemon became ready in time
+    """
+    import httpx
+    
+    deadline = time.monotonic() + timeout
+    while True:
         try:
-            response = httpx.get(f"{config.server_url}/health", timeout=5.0)
-            return response.status_code == 200
+            if _http_client().get("/health", timeout=1.0).status_code == 200:
+                return True
         except httpx.RequestError:
+            pass
+        
+        if time.monotonic() >= deadline:
             return False
-            
-    except Exception:
-        return False
+        time.sleep(DAEMON_POLL_INTERVAL)
 
 
 def call_daemon(goal: str) -> Optional[str]:
     """
     Call the daemon to get a command suggestion.
     
+    The daemon is only started if the request cannot connect to it, so
+    the common case of an already running daemon costs one round trip.
+    
     Args:
         goal: Natural language goal
         
     Returns:
         Suggested command or None if failed
     """
-    if not ensure_daemon_running():
-        typer.echo("Error: Could not start AI Shell daemon", err=True)
-        return None
+    import httpx
     
     try:
         payload = {
@@ -83,11 +122,14 @@ def call_daemon(goal: str) -> Optional[str]:
             "shell": os.environ.get("SHELL", "").split("/")[-1] if os.environ.get("SHELL") else "unknown",
         }
         
-        response = httpx.post(
-            f"{config.server_url}/suggest",
-            json=payload,
-            timeout=30.0,
-        )
+        try:
+            response = _http_client().post("/suggest", json=payload)
+        except httpx.ConnectError:
+            # Nothing was sent, so start the daemon and retry once it is up
+            if not (_start_daemon() and _wait_for_daemon()):
+                typer.echo("Error: Could not start AI Shell daemon", err=True)
+                return None
+            response = _http_client().post("/suggest", json=payload)
         
         if response.status_code == 200:
             data = response.json()
@@ -123,6 +165,8 @@ def suggest(goal: str = typer.Argument(..., help="Natural language goal")):
         # Print explanation and warnings to STDERR
         typer.echo(f"# Suggested command for: {goal}", err=True)
         
+        from . import safety
+        
         warnings = safety.get_safety_warnings(command)
         for warning in warnings:
             typer.echo(warning, err=True)
@@ -146,12 +190,14 @@ def run(goal: str = typer.Argument(..., help="Natural language goal")):
     typer.echo(f"Suggested command: {typer.style(command, fg=typer.colors.CYAN)}")
     
     # Show safety warnings
-    warnings = safety.get_safety_warnings(command)
-    for warning in warnings:
+    from . import safety
+    
+    safety_result = safety.evaluate(command)
+    for warning in safety_result.warnings:
         typer.echo(warning)
     
     # Ask for confirmation
-    if safety.requires_confirmation(command):
+    if safety_result.requires_confirmation:
         confirm = typer.confirm("⚠️  This command requires confirmation. Execute?", default=False)
     else:
         confirm = typer.confirm("Execute this command?", default=True)
@@ -167,14 +213,14 @@ def run(goal: str = typer.Argument(..., help="Natural language goal")):
             )
             
             # Log the execution
-            audit_logger.log_suggestion(
+            _audit().log_suggestion(
                 goal=goal,
                 command=command,
                 cwd=os.getcwd(),
                 provider=config.ai_provider,
                 approved=True,
                 exit_code=result.returncode,
-                risk_score=safety.risk_score(command),
+                risk_score=safety_result.risk,
             )
             
             sys.exit(result.returncode)
@@ -187,13 +233,13 @@ def run(goal: str = typer.Argument(..., help="Natural language goal")):
             sys.exit(1)
     else:
         # Log the rejection
-        audit_logger.log_suggestion(
+        _audit().log_suggestion(
             goal=goal,
             command=command,
             cwd=os.getcwd(),
             provider=config.ai_provider,
             approved=False,
-            risk_score=safety.risk_score(command),
+            risk_score=safety_result.risk,
         )
         typer.echo("Command not executed")
 
@@ -210,7 +256,7 @@ def explain(
     """
     if last:
         # Get the last command from audit log
-        entries = audit_logger.get_recent_entries(1)
+        entries = _audit().get_recent_entries(1)
         if not entries:
             typer.echo("No recent commands found", err=True)
             sys.exit(1)
@@ -228,11 +274,12 @@ def explain(
     typer.echo(f"Command: {typer.style(command, fg=typer.colors.CYAN)}")
     
     # Show safety information
-    risk_score = safety.risk_score(command)
-    typer.echo(f"Risk score: {risk_score:.2f}")
+    from . import safety
     
-    warnings = safety.get_safety_warnings(command)
-    for warning in warnings:
+    safety_result = safety.evaluate(command)
+    typer.echo(f"Risk score: {safety_result.risk:.2f}")
+    
+    for warning in safety_result.warnings:
         typer.echo(warning)
     
     # Basic command breakdown
@@ -246,9 +293,11 @@ def explain(
 @app.command()
 def status():
     """Show AI Shell status and statistics."""
+    import httpx
+    
     # Check daemon status
     try:
-        response = httpx.get(f"{config.server_url}/health", timeout=2.0)
+        response = _http_client().get("/health", timeout=2.0)
         if response.status_code == 200:
             typer.echo("✅ Daemon is running")
             data = response.json()
@@ -265,7 +314,7 @@ def status():
     typer.echo(f"  Log path: {config.expanded_log_path}")
     
     # Show statistics
-    stats = audit_logger.get_stats()
+    stats = _audit().get_stats()
     typer.echo(f"\nStatistics:")
     typer.echo(f"  Total entries: {stats['total_entries']}")
     typer.echo(f"  Approval rate: {stats['approval_rate']:.1%}")
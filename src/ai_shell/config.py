@@ -1,68 +1,118 @@
 """Configuration management for AI Shell."""
 
 import os
+from dataclasses import dataclass, fields
 from pathlib import Path
-from typing import Literal
+from typing import Any, Dict, Literal, Optional, get_args
 
-from dotenv import load_dotenv
-from pydantic_settings import BaseSettings
-from pydantic import Field
+from dotenv import dotenv_values
 
 
-class Config(BaseSettings):
-    """Application configuration loaded from environment variables and .env file."""
-    
+ProviderName = Literal["openai", "ollama"]
+
+
+@dataclass(frozen=True, slots=True)
+class Config:
+    """
+    Application configuration loaded from environment variables and .env file.
+
+    Each field is read from the environment variable of the same name in
+    upper case, e.g. ``ai_port`` from ``AI_PORT``.
+    """
+
     # Provider settings
-    ai_provider: Literal["openai", "ollama"] = Field(default="openai", alias="AI_PROVIDER")
-    
+    ai_provider: ProviderName = "openai"
+
     # OpenAI settings
-    openai_api_key: str = Field(default="", alias="OPENAI_API_KEY")
-    openai_model: str = Field(default="gpt-4o-mini", alias="OPENAI_MODEL")
-    
+    openai_api_key: str = ""
+    openai_model: str = "gpt-4o-mini"
+
     # Ollama settings
-    ollama_host: str = Field(default="http://127.0.0.1:11434", alias="OLLAMA_HOST")
-    ollama_model: str = Field(default="llama3.1:8b", alias="OLLAMA_MODEL")
-    
+    ollama_host: str = "http://127.0.0.1:11434"
+    ollama_model: str = "llama3.1:8b"
+
     # Server settings
-    ai_host: str = Field(default="127.0.0.1", alias="AI_HOST")
-    ai_port: int = Field(default=8765, alias="AI_PORT")
-    
+    ai_host: str = "127.0.0.1"
+    ai_port: int = 8765
+    ai_socket_path: str = "~/.ai-shell/sock"
+
     # Logging settings
-    log_path: str = Field(default="~/.ai-shell/audit.jsonl", alias="LOG_PATH")
-    
-    model_config = {
-        "env_file": ".env",
-        "env_file_encoding": "utf-8"
-    }
-    
+    log_path: str = "~/.ai-shell/audit.jsonl"
+
+    def __post_init__(self) -> None:
+        """Validate settings that have a fixed set of values."""
+        if self.ai_provider not in get_args(ProviderName):
+            raise ValueError(
+                f"AI_PROVIDER must be one of {', '.join(get_args(ProviderName))}, "
+                f"got {self.ai_provider!r}"
+            )
+
     @property
     def expanded_log_path(self) -> Path:
         """Get log path with ~ expanded."""
         return Path(self.log_path).expanduser()
-    
+
+    @property
+    def expanded_socket_path(self) -> Path:
+        """Get the daemon's UNIX socket path with ~ expanded."""
+        return Path(self.ai_socket_path).expanduser()
+
     @property
     def server_url(self) -> str:
         """Get full server URL."""
         return f"http://{self.ai_host}:{self.ai_port}"
 
 
-def load_config() -> Config:
-    """Load configuration from .env file and environment variables."""
-    # Try to load .env from current directory or parent directories
+def _coerce_int(name: str, value: str) -> int:
+    """Parse an integer setting, naming the variable in the error."""
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer, got {value!r}") from None
+
+
+def _find_env_file() -> Optional[Path]:
+    """Find .env in the current directory or one of its parents."""
     env_path = Path(".env")
-    if not env_path.exists():
-        # Look for .env in parent directories
-        current = Path.cwd()
-        for parent in [current] + list(current.parents):
-            env_candidate = parent / ".env"
-            if env_candidate.exists():
-                env_path = env_candidate
-                break
-    
     if env_path.exists():
-        load_dotenv(env_path)
-    
-    return Config()
+        return env_path
+
+    current = Path.cwd()
+    for parent in [current] + list(current.parents):
+        env_candidate = parent / ".env"
+        if env_candidate.exists():
+            return env_candidate
+
+    return None
+
+
+def load_config() -> Config:
+    """Load configuration from .env file and environment variables."""
+    env: Dict[str, str] = {}
+
+    # Read .env without exporting it into os.environ. Names are matched
+    # case-insensitively, so keys are upper-cased on the way in
+    env_path = _find_env_file()
+    if env_path is not None:
+        env.update(
+            (key.upper(), value)
+            for key, value in dotenv_values(env_path, encoding="utf-8").items()
+            if value is not None
+        )
+
+    # Real environment variables take precedence over .env
+    env.update((key.upper(), value) for key, value in os.environ.items())
+
+    values: Dict[str, Any] = {}
+    for field in fields(Config):
+        raw = env.get(field.name.upper())
+        if raw is not None:
+            values[field.name] = raw
+
+    if "ai_port" in values:
+        values["ai_port"] = _coerce_int("AI_PORT", values["ai_port"])
+
+    return Config(**values)
 
 
 # Global config instance
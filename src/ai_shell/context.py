@@ -1,24 +1,147 @@
 """Context collection for AI command suggestions."""
 
+import functools
+import heapq
 import os
+import platform
 import subprocess
 from pathlib import Path
 from typing import Dict, Any, List, Optional
 
+from .cache import TTLCache
+
+try:
+    import pygit2
+except ImportError:  # pragma: no cover - optional dependency
+    pygit2 = None  # type: ignore[assignment]
+
+
+if pygit2 is not None:
+    # Porcelain v1 status letters for pygit2 index and worktree flags
+    _INDEX_CODES = (
+        (pygit2.GIT_STATUS_INDEX_NEW, "A"),
+        (pygit2.GIT_STATUS_INDEX_MODIFIED, "M"),
+        (pygit2.GIT_STATUS_INDEX_DELETED, "D"),
+        (pygit2.GIT_STATUS_INDEX_RENAMED, "R"),
+        (pygit2.GIT_STATUS_INDEX_TYPECHANGE, "T"),
+    )
+    _WORKTREE_CODES = (
+        (pygit2.GIT_STATUS_WT_MODIFIED, "M"),
+        (pygit2.GIT_STATUS_WT_DELETED, "D"),
+        (pygit2.GIT_STATUS_WT_RENAMED, "R"),
+        (pygit2.GIT_STATUS_WT_TYPECHANGE, "T"),
+    )
+
+
+# Maximum number of directories searched upwards for a git repository
+MAX_GIT_SEARCH_DEPTH = 40
+
+# Collected context is reused for a directory whose entries have not changed
+# within this many seconds; edits inside files do not change the directory's
+# mtime, so this also bounds how stale git status can be
+CONTEXT_CACHE_TTL = 5.0
+CONTEXT_CACHE_SIZE = 64
+
+
+@functools.cache
+def _os_info() -> str:
+    """Get basic OS information; it cannot change while the process runs."""
+    return f"{platform.system()} {platform.release()}"
+
+
+@functools.cache
+def _shell_name() -> str:
+    """Get the login shell name from the environment of this process."""
+    shell = os.environ.get("SHELL", "")
+    if shell:
+        return Path(shell).name
+    return "unknown"
+
+
+@functools.lru_cache(maxsize=128)
+def _search_git_root(cwd: str) -> str:
+    """
+    Find the working tree containing cwd by looking for a .git entry.
+    
+    Raises LookupError outside a repository. lru_cache does not cache
+    exceptions, so only found roots are remembered and a directory is
+    searched again until it becomes part of a repository (e.g. git init).
+    """
+    path = Path(os.path.abspath(cwd))
+    for _ in range(MAX_GIT_SEARCH_DEPTH):
+        if (path / ".git").exists():
+            return str(path)
+        if path.parent == path:
+            break
+        path = path.parent
+    raise LookupError(cwd)
+
+
+def _find_git_root(cwd: str) -> Optional[str]:
+    """Find the working tree containing cwd, or None outside a repository."""
+    try:
+        return _search_git_root(cwd)
+    except LookupError:
+        return None
+
+
+@functools.lru_cache(maxsize=32)
+def _open_repository(root: str) -> "pygit2.Repository":
+    """Open a repository, reusing it on repeated collects."""
+    return pygit2.Repository(root)
+
+
+def _format_status(repo: "pygit2.Repository") -> str:
+    """Render a repository status like ``git status --porcelain -b``."""
+    if repo.head_is_unborn:
+        lines = ["## No commits yet"]
+    elif repo.head_is_detached:
+        lines = ["## HEAD (no branch)"]
+    else:
+        lines = [f"## {repo.head.shorthand}"]
+    
+    # "normal" reports an untracked directory once as "dir/", as git does
+    entries = []
+    for path, flags in repo.status(untracked_files="normal").items():
+        if flags & pygit2.GIT_STATUS_IGNORED:
+            continue
+        if flags & pygit2.GIT_STATUS_CONFLICTED:
+            code = "UU"
+        elif flags & pygit2.GIT_STATUS_WT_NEW:
+            code = "??"
+        else:
+            index = next((c for flag, c in _INDEX_CODES if flags & flag), " ")
+            worktree = next((c for flag, c in _WORKTREE_CODES if flags & flag), " ")
+            code = index + worktree
+        entries.append((code, path))
+    
+    # Tracked changes first, then untracked files, each sorted by path
+    entries.sort(key=lambda entry: (entry[0] == "??", entry[1]))
+    lines.extend(f"{code} {path}" for code, path in entries)
+    
+    return "\n".join(lines)
+
 
 class ContextCollector:
     """Collects contextual information about the current environment."""
     
-    def __init__(self, max_files: int = 200, max_git_output: int = 1500):
+    def __init__(
+        self,
+        max_files: int = 200,
+        max_git_output: int = 1500,
+        cache_ttl: float = CONTEXT_CACHE_TTL,
+    ):
         """
         Initialize context collector.
         
         Args:
             max_files: Maximum number of files to include in context
             max_git_output: Maximum characters from git status output
+            cache_ttl: Seconds collected context is reused for an unchanged directory
         """
         self.max_files = max_files
         self.max_git_output = max_git_output
+        self._cache: "TTLCache[Dict[str, Any]]" = TTLCache(CONTEXT_CACHE_SIZE, cache_ttl)
     
     def collect(self, cwd: Optional[str] = None) -> Dict[str, Any]:
         """
@@ -33,6 +156,18 @@ class ContextCollector:
         if cwd is None:
             cwd = os.getcwd()
         
+        # Key on the directory's mtime so adding, removing or renaming an
+        # entry forces a fresh scan
+        try:
+            key = (cwd, os.stat(cwd).st_mtime_ns)
+        except OSError:
+            key = None
+        
+        if key is not None:
+            cached = self._cache.get(key)
+            if cached is not None:
+                return dict(cached)
+        
         context = {
             "cwd": cwd,
             "shell": self._get_shell(),
@@ -51,14 +186,14 @@ class ContextCollector:
         # Add OS information
         context["os"] = self._get_os_info()
         
+        if key is not None:
+            self._cache.set(key, context)
+            return dict(context)
         return context
     
     def _get_shell(self) -> str:
         """Get current shell name."""
-        shell = os.environ.get("SHELL", "")
-        if shell:
-            return Path(shell).name
-        return "unknown"
+        return _shell_name()
     
     def _get_git_status(self, cwd: str) -> Optional[str]:
         """
@@ -70,6 +205,14 @@ class ContextCollector:
         Returns:
             Git status string or None if not a git repository
         """
+        # Outside a repository there is nothing to ask git for
+        root = _find_git_root(cwd)
+        if root is None:
+            return None
+        
+        if pygit2 is not None:
+            return self._get_git_status_pygit2(root)
+        
         try:
             result = subprocess.run(
                 ["git", "status", "--porcelain", "-b"],
@@ -91,6 +234,26 @@ class ContextCollector:
         
         return None
     
+    def _get_git_status_pygit2(self, root: str) -> Optional[str]:
+        """
+        Get git status in-process through libgit2 instead of forking git.
+        
+        Args:
+            root: Working tree root of the repository
+            
+        Returns:
+            Git status string or None if the repository cannot be read
+        """
+        try:
+            output = _format_status(_open_repository(root))
+        except pygit2.GitError:
+            return None
+        
+        # Truncate output if too long
+        if len(output) > self.max_git_output:
+            output = output[:self.max_git_output] + "..."
+        return output
+    
     def _get_file_listing(self, cwd: str) -> List[str]:
         """
         Get a sample of files and directories in the current directory.
@@ -102,27 +265,22 @@ class ContextCollector:
             List of file/directory names
         """
         try:
-            path = Path(cwd)
-            if not path.exists() or not path.is_dir():
-                return []
-            
             # Get all items, excluding hidden files
-            items = []
-            for item in path.iterdir():
-                if not item.name.startswith("."):
-                    items.append(item.name)
+            with os.scandir(cwd) as it:
+                items = [entry.name for entry in it if not entry.name.startswith(".")]
             
-            # Sort and limit
+            # Sort and limit, only ordering what we keep in large directories
+            if len(items) > self.max_files:
+                return heapq.nsmallest(self.max_files, items)
             items.sort()
-            return items[:self.max_files]
+            return items
             
         except (OSError, PermissionError):
             return []
     
     def _get_os_info(self) -> str:
         """Get basic OS information."""
-        import platform
-        return f"{platform.system()} {platform.release()}"
+        return _os_info()
     
     def _run_command_safe(self, command: List[str], cwd: str, timeout: int = 5) -> Optional[str]:
         """
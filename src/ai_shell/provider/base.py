@@ -1,7 +1,22 @@
 """Base AI provider interface."""
 
+import re
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+
+import httpx
+
+
+# Opening code fence (with optional language tag) and the first non-blank line
+_FENCE_RE = re.compile(r"```[^\n]*\n\s*([^\n]*)")
+
+_SYSTEM_PROMPT = (
+    "You are a helpful assistant that converts natural language goals into "
+    "safe, single-line shell commands for macOS/Unix systems. "
+    "Return ONLY the command, no explanation or formatting. "
+    "Prefer commands with dry-run flags when available. "
+    "Never return destructive commands without confirmation flags."
+)
 
 
 class ProviderError(Exception):
@@ -12,6 +27,9 @@ class ProviderError(Exception):
 class AIProvider(ABC):
     """Abstract base class for AI providers."""
     
+    # HTTP client shared across suggest() calls, created lazily by subclasses
+    _client: Optional[httpx.AsyncClient] = None
+    
     @abstractmethod
     async def suggest(self, goal: str, context: Dict[str, Any]) -> str:
         """
@@ -29,52 +47,50 @@ class AIProvider(ABC):
         """
         pass
     
+    async def aclose(self) -> None:
+        """Close the provider's HTTP client, if one was created."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
     def _build_system_prompt(self) -> str:
         """Build the system prompt for the AI model."""
-        return (
-            "You are a helpful assistant that converts natural language goals into "
-            "safe, single-line shell commands for macOS/Unix systems. "
-            "Return ONLY the command, no explanation or formatting. "
-            "Prefer commands with dry-run flags when available. "
-            "Never return destructive commands without confirmation flags."
-        )
+        return _SYSTEM_PROMPT
     
     def _build_user_prompt(self, goal: str, context: Dict[str, Any]) -> str:
         """Build the user prompt with goal and context."""
-        prompt_parts = [f"Goal: {goal}"]
+        cwd = context.get("cwd")
+        shell = context.get("shell")
+        git = context.get("git")
+        files = context.get("files_sample")
         
-        if context.get("cwd"):
-            prompt_parts.append(f"Current directory: {context['cwd']}")
-        
-        if context.get("shell"):
-            prompt_parts.append(f"Shell: {context['shell']}")
-        
-        if context.get("git"):
-            prompt_parts.append(f"Git status: {context['git']}")
-        
-        if context.get("files_sample"):
-            files = context["files_sample"][:10]  # Limit to first 10 files
-            prompt_parts.append(f"Files in directory: {', '.join(files)}")
-        
-        return "\n".join(prompt_parts)
+        return "\n".join(filter(None, (
+            f"Goal: {goal}",
+            cwd and f"Current directory: {cwd}",
+            shell and f"Shell: {shell}",
+            git and f"Git status: {git}",
+            # Limit to first 10 files
+            files and f"Files in directory: {', '.join(files[:10])}",
+        )))
     
     def _clean_command(self, raw_response: str) -> str:
         """Clean the raw response to extract just the command."""
         # Remove code fences
         response = raw_response.strip()
-        if response.startswith("```"):
-            lines = response.split("\n")
-            # Find first non-fence line
-            for i, line in enumerate(lines):
-                if not line.startswith("```") and line.strip():
-                    response = line.strip()
-                    break
-        
-        # Remove any remaining backticks or formatting
-        response = response.strip("`").strip()
-        
-        # Take only the first line if multiple lines
-        if "\n" in response:
-            response = response.split("\n")[0].strip()
+        match = _FENCE_RE.match(response)
+        if match and not match.group(1).startswith("```"):
+            response = match.group(1).strip()
+        elif response.startswith("```"):
+            # The line after the opening fence is itself a fence, e.g. the
+            # command sits on the opening line: take the first non-fence line
+            response = next(
+                (
+                    line.strip()
+                    for line in response.split("\n")
+                    if line.strip() and not line.startswith("```")
+                ),
+                response,
+            )
         
-        return response
+        # Remove any remaining backticks, then take only the first line
+        return response.strip("`").strip().split("\n", 1)[0].strip()
@@ -4,7 +4,8 @@ from typing import Dict, Any
 
 import httpx
 
-from .base import AIProvider, ProviderError
+from .. import jsonutil
+from .base import _SYSTEM_PROMPT, AIProvider, ProviderError
 
 
 class OllamaProvider(AIProvider):
@@ -20,36 +21,45 @@ class OllamaProvider(AIProvider):
         """
         self.host = host.rstrip("/")
         self.model = model
-    
-    async def suggest(self, goal: str, context: Dict[str, Any]) -> str:
-        """Generate command suggestion using Ollama API."""
-        # Build the full prompt (Ollama doesn't have separate system/user messages in chat API)
-        full_prompt = f"{self._build_system_prompt()}\n\n{self._build_user_prompt(goal, context)}"
-        
-        payload = {
+        # Ollama's generate API takes one prompt, so the system prompt leads it
+        self._prompt_prefix = _SYSTEM_PROMPT + "\n\n"
+        # Request fields that are the same for every suggestion
+        self._static = {
             "model": self.model,
-            "prompt": full_prompt,
             "stream": False,
             "options": {
                 "temperature": 0.1,
                 "num_predict": 50,  # Limit tokens for short responses
-            }
+            },
         }
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Get the shared HTTP client, creating it on first use."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.host,
+                headers={"Content-Type": "application/json"},
+                timeout=60.0,
+            )
+        return self._client
+    
+    async def suggest(self, goal: str, context: Dict[str, Any]) -> str:
+        """Generate command suggestion using Ollama API."""
+        full_prompt = self._prompt_prefix + self._build_user_prompt(goal, context)
+        
+        payload = {**self._static, "prompt": full_prompt}
         
         try:
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                response = await client.post(
-                    f"{self.host}/api/generate",
-                    json=payload,
-                )
-                response.raise_for_status()
-                
-                data = await response.json()
-                if not data.get("response"):
-                    raise ProviderError("No response from Ollama")
-                
-                raw_command = data["response"]
-                return self._clean_command(raw_command)
+            client = self._get_client()
+            response = await client.post("/api/generate", content=jsonutil.dumps(payload))
+            response.raise_for_status()
+            
+            data = jsonutil.loads(await response.aread())
+            if not data.get("response"):
+                raise ProviderError("No response from Ollama")
+            
+            raw_command = data["response"]
+            return self._clean_command(raw_command)
                 
         except httpx.ConnectError:
             raise ProviderError(
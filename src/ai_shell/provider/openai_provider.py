@@ -1,11 +1,11 @@
 """OpenAI provider implementation."""
 
-import json
 from typing import Dict, Any
 
 import httpx
 
-from .base import AIProvider, ProviderError
+from .. import jsonutil
+from .base import _SYSTEM_PROMPT, AIProvider, ProviderError
 
 
 class OpenAIProvider(AIProvider):
@@ -22,42 +22,52 @@ class OpenAIProvider(AIProvider):
         self.api_key = api_key
         self.model = model
         self.base_url = "https://api.openai.com/v1"
+        # Request fields that are the same for every suggestion
+        self._static = {
+            "model": self.model,
+            "max_tokens": 100,
+            "temperature": 0.1,
+        }
+        self._system_message = {"role": "system", "content": _SYSTEM_PROMPT}
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Get the shared HTTP/2 client, creating it on first use."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json",
+                },
+                timeout=30.0,
+                http2=True,
+            )
+        return self._client
     
     async def suggest(self, goal: str, context: Dict[str, Any]) -> str:
         """Generate command suggestion using OpenAI API."""
         if not self.api_key or self.api_key == "sk-REPLACE_ME":
             raise ProviderError("OpenAI API key not configured")
         
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-        }
-        
         payload = {
-            "model": self.model,
+            **self._static,
             "messages": [
-                {"role": "system", "content": self._build_system_prompt()},
+                self._system_message,
                 {"role": "user", "content": self._build_user_prompt(goal, context)},
             ],
-            "max_tokens": 100,
-            "temperature": 0.1,
         }
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"{self.base_url}/chat/completions",
-                    headers=headers,
-                    json=payload,
-                )
-                response.raise_for_status()
-                
-                data = await response.json()
-                if not data.get("choices"):
-                    raise ProviderError("No response from OpenAI")
-                
-                raw_command = data["choices"][0]["message"]["content"]
-                return self._clean_command(raw_command)
+            client = self._get_client()
+            response = await client.post("/chat/completions", content=jsonutil.dumps(payload))
+            response.raise_for_status()
+            
+            data = jsonutil.loads(await response.aread())
+            if not data.get("choices"):
+                raise ProviderError("No response from OpenAI")
+            
+            raw_command = data["choices"][0]["message"]["content"]
+            return self._clean_command(raw_command)
                 
         except httpx.HTTPStatusError as e:
             if e.response.status_code == 401:
@@ -1,177 +1,409 @@
 """Safety checks and command filtering."""
 
+import functools
 import re
-from typing import List, Tuple
+import threading
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Tuple
 
+try:
+    import ahocorasick  # type: ignore[import-not-found]
+except ImportError:  # pragma: no cover - exercised only without pyahocorasick
+    ahocorasick = None
 
-class Safety:
-    """Safety checker for shell commands."""
-    
-    # Dangerous patterns that should be blocked or require confirmation
-    DANGEROUS_PATTERNS = [
-        # Destructive file operations
-        r"rm\s+-rf\s+/",
-        r"rm\s+-rf\s+\*",
-        r"rm\s+-rf\s+~",
-        r"rm\s+-rf\s+\$HOME",
-        
-        # Filesystem operations
-        r"mkfs",
-        r"fdisk",
-        r"parted",
-        
-        # Device operations
-        r"dd\s+.*of=/dev/",
-        
-        # Permission changes on system directories
-        r"chmod\s+.*\s+/",
-        r"chown\s+.*\s+/",
-        
-        # Network/firewall
-        r"iptables\s+-F",
-        r"ufw\s+--force",
-        
-        # System modifications
-        r"systemctl\s+disable",
-        r"launchctl\s+unload",
-        
-        # Package management (potentially dangerous)
-        r"brew\s+uninstall\s+--force",
-        r"npm\s+uninstall\s+-g",
-        
-        # Kernel/system
-        r"kextunload",
-        r"dtrace",
-    ]
-    
-    # Commands that should have dry-run flags added when possible
-    DRY_RUN_COMMANDS = {
-        "rsync": "--dry-run",
-        "cp": "-n",  # no-clobber
-        "mv": "-n",  # no-clobber
-        "git clean": "--dry-run",
-        "git reset": "--dry-run", 
-        "brew cleanup": "--dry-run",
-    }
+try:
+    import hyperscan
+except ImportError:  # pragma: no cover - exercised only without hyperscan
+    hyperscan = None  # type: ignore[assignment]
+
+
+class SafetyResult(NamedTuple):
+    """Outcome of running every safety check on a command."""
+    risk: float
+    warnings: List[str]
+    requires_confirmation: bool
+
+
+# Dangerous patterns that should be blocked or require confirmation
+DANGEROUS_PATTERNS = [
+    # Destructive file operations
+    r"rm\s+-rf\s+/",
+    r"rm\s+-rf\s+\*",
+    r"rm\s+-rf\s+~",
+    r"rm\s+-rf\s+\$HOME",
     
-    def risk_score(self, command: str) -> float:
-        """
-        Calculate risk score for a command (0.0 = safe, 1.0 = very dangerous).
-        
-        Args:
-            command: Shell command to analyze
-            
-        Returns:
-            Risk score between 0.0 and 1.0
-        """
-        if not command or not command.strip():
-            return 0.0
-        
-        command = command.strip().lower()
-        risk = 0.0
-        
-        # Check dangerous patterns
-        for pattern in self.DANGEROUS_PATTERNS:
-            if re.search(pattern, command, re.IGNORECASE):
-                risk = max(risk, 0.9)
-        
-        # Check for sudo usage
-        if command.startswith("sudo "):
-            risk = max(risk, 0.3)
-        
-        # Check for file deletion
-        if re.search(r"\brm\b", command):
-            if "-r" in command or "-f" in command:
-                risk = max(risk, 0.6)
-            else:
-                risk = max(risk, 0.2)
-        
-        # Check for network operations
-        if any(net_cmd in command for net_cmd in ["curl", "wget", "ssh", "scp"]):
-            risk = max(risk, 0.1)
-        
-        # Check for system modifications
-        if any(sys_cmd in command for sys_cmd in ["install", "uninstall", "remove"]):
-            risk = max(risk, 0.3)
-        
-        return min(risk, 1.0)
+    # Filesystem operations
+    r"mkfs",
+    r"fdisk",
+    r"parted",
     
-    def requires_confirmation(self, command: str) -> bool:
-        """
-        Check if command requires user confirmation before execution.
-        
-        Args:
-            command: Shell command to check
-            
-        Returns:
-            True if confirmation is required
-        """
-        return self.risk_score(command) >= 0.5
-    
-    def rewrite_to_dry_run(self, command: str) -> str:
-        """
-        Attempt to rewrite command to use dry-run flags where possible.
-        
-        Args:
-            command: Original command
-            
-        Returns:
-            Command with dry-run flags added if applicable
-        """
-        command = command.strip()
-        
-        for cmd_prefix, dry_run_flag in self.DRY_RUN_COMMANDS.items():
-            if command.startswith(cmd_prefix + " "):
-                # Check if dry-run flag is already present
-                if dry_run_flag not in command:
-                    # For multi-word commands like "git clean", handle specially
-                    if " " in cmd_prefix:
-                        # Replace the multi-word command with command + dry-run flag
-                        rest = command[len(cmd_prefix):].strip()
-                        return f"{cmd_prefix} {dry_run_flag} {rest}".strip()
-                    else:
-                        # Single word command - insert dry-run flag after command name
-                        parts = command.split(" ", 1)
-                        if len(parts) == 2:
-                            return f"{parts[0]} {dry_run_flag} {parts[1]}"
-                        else:
-                            return f"{parts[0]} {dry_run_flag}"
-        
-        return command
+    # Device operations
+    r"dd\s+.*of=/dev/",
     
-    def get_safety_warnings(self, command: str) -> List[str]:
-        """
-        Get list of safety warnings for a command.
-        
-        Args:
-            command: Command to analyze
-            
-        Returns:
-            List of warning messages
-        """
-        warnings = []
-        risk = self.risk_score(command)
+    # Permission changes on system directories
+    r"chmod\s+.*\s+/",
+    r"chown\s+.*\s+/",
+    
+    # Network/firewall
+    r"iptables\s+-F",
+    r"ufw\s+--force",
+    
+    # System modifications
+    r"systemctl\s+disable",
+    r"launchctl\s+unload",
+    
+    # Package management (potentially dangerous)
+    r"brew\s+uninstall\s+--force",
+    r"npm\s+uninstall\s+-g",
+    
+    # Kernel/system
+    r"kextunload",
+    r"dtrace",
+]
+
+# Commands that should have dry-run flags added when possible
+DRY_RUN_COMMANDS = {
+    "rsync": "--dry-run",
+    "cp": "-n",  # no-clobber
+    "mv": "-n",  # no-clobber
+    "git clean": "--dry-run",
+    "git reset": "--dry-run",
+    "brew cleanup": "--dry-run",
+}
+
+# Dangerous patterns with no regex syntax, which a literal matcher can take
+_LITERAL_DANGEROUS = [pattern for pattern in DANGEROUS_PATTERNS if re.escape(pattern) == pattern]
+_REGEX_DANGEROUS = [pattern for pattern in DANGEROUS_PATTERNS if pattern not in _LITERAL_DANGEROUS]
+
+
+def _build_main_re(dangerous_patterns: List[str]) -> "re.Pattern[str]":
+    """
+    Combine dangerous patterns, sudo and rm into one alternation.
+    
+    A command is then scanned once, and the named group of each match
+    (danger, sudo or rm) says which check fired.
+    """
+    return re.compile(
+        "(?P<danger>" + "|".join(f"(?:{pattern})" for pattern in dangerous_patterns) + ")"
+        r"|(?P<sudo>^sudo\s)"
+        r"|(?P<rm>\brm\b)",
+        re.IGNORECASE,
+    )
+
+
+# Every dangerous pattern, used when hyperscan is not installed
+_MAIN_RE = _build_main_re(DANGEROUS_PATTERNS)
+# Only the true regexes, once hyperscan has ruled out the literals
+_REGEX_MAIN_RE = _build_main_re(_REGEX_DANGEROUS)
+
+
+def _build_literal_database() -> "hyperscan.Database":
+    """Compile the literal dangerous patterns into a hyperscan database."""
+    database = hyperscan.Database()
+    database.compile(
+        expressions=[pattern.encode() for pattern in _LITERAL_DANGEROUS],
+        ids=list(range(len(_LITERAL_DANGEROUS))),
+        elements=len(_LITERAL_DANGEROUS),
+        flags=[hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SINGLEMATCH] * len(_LITERAL_DANGEROUS),
+    )
+    return database
+
+
+_LITERAL_DATABASE = _build_literal_database() if hyperscan is not None else None
+
+# A scratch space serves one scan at a time and scans run without the GIL,
+# so each thread allocates its own
+_scan_state = threading.local()
+
+
+def _stop_scan(*_: object) -> bool:
+    """Hyperscan match handler that ends the scan at the first match."""
+    return True
+
+
+def _has_dangerous_literal(command: str) -> Optional[bool]:
+    """
+    Check a command for literal dangerous patterns with hyperscan.
+    
+    Returns:
+        Whether a literal pattern matched, or None if hyperscan is not
+        installed or the scan failed and the regex must check them instead
+    """
+    if _LITERAL_DATABASE is None:
+        return None
+    
+    try:
+        scratch = getattr(_scan_state, "scratch", None)
+        if scratch is None:
+            scratch = _scan_state.scratch = hyperscan.Scratch(_LITERAL_DATABASE)
+        _LITERAL_DATABASE.scan(command.encode(), match_event_handler=_stop_scan, scratch=scratch)
+    except hyperscan.ScanTerminated:
+        return True
+    except hyperscan.error:
+        return None
+    return False
+
+# Read-only commands that score 0.0 unless shell syntax chains in others
+_SAFE_LEADING = frozenset({
+    "ls", "pwd", "echo", "cat", "grep", "which", "true", "false", "date", "hostname",
+})
+_META_RE = re.compile(r"[;|&$`><\r\n]")
+
+# DRY_RUN_COMMANDS keyed by the command's leading words
+_DRY_RUN_LOOKUP = {
+    tuple(prefix.split()): flag for prefix, flag in DRY_RUN_COMMANDS.items()
+}
+
+# Substrings that raise the risk score, grouped by the check they feed
+_KEYWORDS = {
+    "net": ("curl", "wget", "ssh", "scp"),
+    "sys": ("install", "uninstall", "remove"),
+    "rm_r": ("-r",),
+    "rm_f": ("-f",),
+}
+
+
+def _build_automaton() -> "ahocorasick.Automaton":
+    """Build an Aho-Corasick automaton mapping each keyword to its tag."""
+    automaton = ahocorasick.Automaton()
+    for tag, keywords in _KEYWORDS.items():
+        for keyword in keywords:
+            automaton.add_word(keyword, tag)
+    automaton.make_automaton()
+    return automaton
+
+
+_KEYWORD_AUTOMATON = _build_automaton() if ahocorasick is not None else None
+
+# Fallback matcher: a lookahead tried at every position, so overlapping
+# keywords such as "-r" and "remove" in "-remove" are all reported
+_KEYWORD_RE = re.compile(
+    "(?="
+    + "|".join(
+        f"(?P<{tag}>{'|'.join(map(re.escape, keywords))})"
+        for tag, keywords in _KEYWORDS.items()
+    )
+    + ")"
+)
+
+
+def _keyword_tags(command: str) -> FrozenSet[str]:
+    """
+    Find which keyword groups occur anywhere in a command, in one pass.
+    
+    Args:
+        command: Lowercased command to scan
+    
+    Returns:
+        Tags from _KEYWORDS with at least one keyword in the command
+    """
+    if _KEYWORD_AUTOMATON is not None:
+        return frozenset(tag for _, tag in _KEYWORD_AUTOMATON.iter(command))
+    # Every alternative is a named group, so lastgroup is always set
+    return frozenset(
+        match.lastgroup for match in _KEYWORD_RE.finditer(command) if match.lastgroup is not None
+    )
+
+
+# Rules never change while the process runs, so cached results never go stale.
+# Results are cached as immutable values and copied into lists on the way out.
+CACHE_SIZE = 1024
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def risk_score(command: str) -> float:
+    """
+    Calculate risk score for a command (0.0 = safe, 1.0 = very dangerous).
+    
+    Args:
+        command: Shell command to analyze
+    
+    Returns:
+        Risk score between 0.0 and 1.0
+    """
+    if not command or not command.strip():
+        return 0.0
+    
+    command = command.strip().lower()
+    
+    # Fast path for the common case of a single read-only command
+    if command.split(None, 1)[0] in _SAFE_LEADING and not _META_RE.search(command):
+        return 0.0
+    
+    has_literal = _has_dangerous_literal(command)
+    if has_literal:
+        return 0.9
+    # Literals hyperscan has ruled out need not be matched again
+    main_re = _MAIN_RE if has_literal is None else _REGEX_MAIN_RE
+    
+    risk = 0.0
+    deletes_files = False
+    
+    for match in main_re.finditer(command):
+        group = match.lastgroup
+        if group == "danger":
+            # Nothing else scores higher than a dangerous pattern
+            return 0.9
+        elif group == "sudo":
+            risk = 0.3
+        else:
+            deletes_files = True
+    
+    tags = _keyword_tags(command)
+    
+    # Check for file deletion
+    if deletes_files:
+        if "rm_r" in tags or "rm_f" in tags:
+            risk = max(risk, 0.6)
+        else:
+            risk = max(risk, 0.2)
+    
+    # Check for network operations
+    if "net" in tags:
+        risk = max(risk, 0.1)
+    
+    # Check for system modifications
+    if "sys" in tags:
+        risk = max(risk, 0.3)
+    
+    return min(risk, 1.0)
+
+
+def requires_confirmation(command: str) -> bool:
+    """
+    Check if command requires user confirmation before execution.
+    
+    Args:
+        command: Shell command to check
+    
+    Returns:
+        True if confirmation is required
+    """
+    return risk_score(command) >= 0.5
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def rewrite_to_dry_run(command: str) -> str:
+    """
+    Attempt to rewrite command to use dry-run flags where possible.
+    
+    Args:
+        command: Original command
+    
+    Returns:
+        Command with dry-run flags added if applicable
+    """
+    command = command.strip()
+    words = command.split(None, 2)
+    
+    # Prefer the longest match, e.g. "git clean" over a plain "git"; the
+    # prefix must be followed by arguments
+    for size in (2, 1):
+        if len(words) <= size:
+            continue
         
-        if risk >= 0.9:
-            warnings.append("⚠️  DANGER: This command could cause irreversible damage")
-        elif risk >= 0.6:
-            warnings.append("⚠️  HIGH RISK: This command could delete or modify important files")
-        elif risk >= 0.3:
-            warnings.append("⚠️  MODERATE RISK: This command requires elevated privileges or makes system changes")
+        dry_run_flag = _DRY_RUN_LOOKUP.get(tuple(words[:size]))
+        if dry_run_flag is None:
+            continue
         
-        if self.requires_confirmation(command):
-            warnings.append("🔒 Confirmation required before execution")
+        # Check if dry-run flag is already present
+        if dry_run_flag in command.split():
+            return command
         
-        return warnings
+        # Insert the dry-run flag after the command name
+        rest = command.split(None, size)[size]
+        return f"{' '.join(words[:size])} {dry_run_flag} {rest}"
     
-    def is_safe_for_auto_execution(self, command: str) -> bool:
-        """
-        Check if command is safe for automatic execution without confirmation.
-        
-        Args:
-            command: Command to check
-            
-        Returns:
-            True if safe for auto-execution
-        """
-        return self.risk_score(command) < 0.3
+    return command
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _evaluate(command: str) -> Tuple[float, Tuple[str, ...], bool]:
+    """Score a command and derive its warnings; see evaluate."""
+    risk = risk_score(command)
+    needs_confirmation = risk >= 0.5
+    
+    warnings: List[str] = []
+    if risk >= 0.9:
+        warnings.append("⚠️  DANGER: This command could cause irreversible damage")
+    elif risk >= 0.6:
+        warnings.append("⚠️  HIGH RISK: This command could delete or modify important files")
+    elif risk >= 0.3:
+        warnings.append("⚠️  MODERATE RISK: This command requires elevated privileges or makes system changes")
+    
+    if needs_confirmation:
+        warnings.append("🔒 Confirmation required before execution")
+    
+    return risk, tuple(warnings), needs_confirmation
+
+
+def get_safety_warnings(command: str) -> List[str]:
+    """
+    Get list of safety warnings for a command.
+    
+    Args:
+        command: Command to analyze
+    
+    Returns:
+        List of warning messages
+    """
+    return list(_evaluate(command)[1])
+
+
+def evaluate(command: str) -> SafetyResult:
+    """
+    Score a command once and derive warnings and confirmation from it.
+    
+    Args:
+        command: Command to analyze
+    
+    Returns:
+        Risk score, warning messages and whether confirmation is required
+    """
+    risk, warnings, needs_confirmation = _evaluate(command)
+    return SafetyResult(risk, list(warnings), needs_confirmation)
+
+
+def is_safe_for_auto_execution(command: str) -> bool:
+    """
+    Check if command is safe for automatic execution without confirmation.
+    
+    Args:
+        command: Command to check
+    
+    Returns:
+        True if safe for auto-execution
+    """
+    return risk_score(command) < 0.3
+
+
+def cache_info() -> Dict[str, Dict[str, int]]:
+    """
+    Get hit and miss counts for the safety check caches.
+    
+    Returns:
+        Cache statistics keyed by check name
+    """
+    return {
+        "risk_score": risk_score.cache_info()._asdict(),
+        "rewrite_to_dry_run": rewrite_to_dry_run.cache_info()._asdict(),
+        "evaluate": _evaluate.cache_info()._asdict(),
+    }
+
+
+class Safety:
+    """
+    Safety checker for shell commands.
+    
+    Kept for compatibility; the checks hold no state and are plain module
+    functions, which this class exposes as static methods.
+    """
+    
+    DANGEROUS_PATTERNS = DANGEROUS_PATTERNS
+    DRY_RUN_COMMANDS = DRY_RUN_COMMANDS
+    
+    risk_score = staticmethod(risk_score)
+    requires_confirmation = staticmethod(requires_confirmation)
+    rewrite_to_dry_run = staticmethod(rewrite_to_dry_run)
+    get_safety_warnings = staticmethod(get_safety_warnings)
+    evaluate = staticmethod(evaluate)
+    is_safe_for_auto_execution = staticmethod(is_safe_for_auto_execution)
@@ -1,15 +1,22 @@
 """FastAPI server for AI Shell daemon."""
 
+import asyncio
+import functools
 import os
-from typing import Dict, Any, Optional, List
+import platform
+import socket
+import sys
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Any, Hashable, Optional, List
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
 from pydantic import BaseModel, Field
 import uvicorn
 
+from . import jsonutil, safety
+from .cache import TTLCache
 from .config import config
-from .provider import OpenAIProvider, OllamaProvider, ProviderError
-from .safety import Safety
+from .provider import AIProvider, OpenAIProvider, OllamaProvider, ProviderError
 from .context import ContextCollector
 from .audit import AuditLogger
 
@@ -21,6 +28,7 @@ class SuggestionRequest(BaseModel):
     shell: Optional[str] = Field(None, description="Shell type (zsh, bash, etc.)")
     context: Optional[Dict[str, Any]] = Field(None, description="Additional context")
     policy: str = Field("normal", description="Safety policy (normal, strict, permissive)")
+    merge_context: bool = Field(True, description="Merge provided context with collected context")
 
 
 class SuggestionResponse(BaseModel):
@@ -31,26 +39,154 @@ class SuggestionResponse(BaseModel):
     alternatives: List[str] = Field(default_factory=list, description="Alternative commands")
 
 
+@functools.lru_cache(maxsize=4)
+def _create_provider(name: str, endpoint: str, model: str) -> AIProvider:
+    """
+    Build a provider once per settings, so its HTTP client is reused.
+    
+    Args:
+        name: Provider name
+        endpoint: OpenAI API key or Ollama host
+        model: Model name
+        
+    Returns:
+        Provider instance shared by every request with these settings
+    """
+    if name == "openai":
+        return OpenAIProvider(endpoint, model)
+    return OllamaProvider(endpoint, model)
+
+
+def get_provider() -> AIProvider:
+    """Get the configured AI provider."""
+    if config.ai_provider == "openai":
+        return _create_provider("openai", config.openai_api_key, config.openai_model)
+    elif config.ai_provider == "ollama":
+        return _create_provider("ollama", config.ollama_host, config.ollama_model)
+    else:
+        raise ValueError(f"Unknown provider: {config.ai_provider}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Release the provider and flush the audit log when the daemon shuts down."""
+    yield
+    # Config is fixed for the process, so a cached provider is get_provider()'s
+    if _create_provider.cache_info().currsize:
+        await get_provider().aclose()
+    
+    # Drain queued audit entries and save statistics here: uvicorn re-raises
+    # SIGTERM once shutdown completes, which skips the logger's atexit hook
+    await asyncio.to_thread(audit_logger.close)
+
+
 # Initialize components
 app = FastAPI(
     title="AI Shell",
     description="AI-assisted terminal command palette",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
-safety = Safety()
 context_collector = ContextCollector()
 audit_logger = AuditLogger(str(config.expanded_log_path))
 
 
-def get_provider():
-    """Get the configured AI provider."""
-    if config.ai_provider == "openai":
-        return OpenAIProvider(config.openai_api_key, config.openai_model)
-    elif config.ai_provider == "ollama":
-        return OllamaProvider(config.ollama_host, config.ollama_model)
+# Identical requests within the TTL are answered without calling the provider
+SUGGESTION_CACHE_SIZE = 512
+SUGGESTION_CACHE_TTL = 300.0
+
+_suggestion_cache: "TTLCache[SuggestionResponse]" = TTLCache(
+    SUGGESTION_CACHE_SIZE, SUGGESTION_CACHE_TTL
+)
+
+# Suggestions being generated, so identical concurrent requests share one call
+_inflight: Dict[Hashable, "asyncio.Task[SuggestionResponse]"] = {}
+
+
+async def _generate_suggestion(
+    request: SuggestionRequest, cwd: str, key: Optional[Hashable]
+) -> SuggestionResponse:
+    """
+    Ask the provider for a command and apply the safety checks to it.
+    
+    Args:
+        request: Suggestion request with goal and context
+        cwd: Working directory the command will run in
+        key: Cache key the result is stored under, or None to skip caching
+        
+    Returns:
+        Command suggestion with safety information
+    """
+    if request.context is not None and not request.merge_context:
+        # Trust the caller's context and skip collection entirely
+        context = dict(request.context)
     else:
-        raise ValueError(f"Unknown provider: {config.ai_provider}")
+        # Collect context in a worker thread: git and directory scans would
+        # otherwise block the event loop and serialize concurrent requests
+        context = await asyncio.to_thread(context_collector.collect, cwd)
+        
+        # Merge provided context over the collected context
+        if request.context is not None:
+            context = {**context, **request.context}
+    
+    # Add shell info if provided
+    if request.shell:
+        context["shell"] = request.shell
+    
+    # Get AI provider and generate suggestion
+    provider = get_provider()
+    raw_command = await provider.suggest(request.goal, context)
+    
+    if not raw_command or not raw_command.strip():
+        raise HTTPException(status_code=400, detail="No command generated")
+    
+    # Apply safety checks
+    command = raw_command.strip()
+    risk_score = safety.risk_score(command)
+    
+    # Apply dry-run rewriting if policy allows; the reported risk is for the
+    # returned command, which only needs scoring again if it changed
+    if request.policy == "normal":
+        rewritten = safety.rewrite_to_dry_run(command)
+        if rewritten != command:
+            command = rewritten
+            risk_score = safety.risk_score(command)
+    
+    # Generate explanation (simple for MVP)
+    explanation = f"Command to: {request.goal}"
+    
+    response = SuggestionResponse(
+        command=command,
+        explanation=explanation,
+        risk=risk_score,
+        alternatives=[],
+    )
+    
+    # Cache before the task finishes, so there is no gap between this
+    # request leaving the in-flight map and its result being cached
+    if key is not None:
+        _suggestion_cache.set(key, response)
+    return response
+
+
+def _cache_key(request: SuggestionRequest, cwd: str) -> Optional[Hashable]:
+    """
+    Build the key identical suggestion requests share.
+    
+    Args:
+        request: Suggestion request with goal and context
+        cwd: Working directory the command will run in
+        
+    Returns:
+        Hashable key, or None if the context cannot be encoded (orjson
+        rejects e.g. integers wider than 64 bits), so the request is not cached
+    """
+    try:
+        context_key = jsonutil.dumps(request.context) if request.context is not None else None
+    except TypeError:
+        return None
+    return (request.goal, cwd, request.shell, request.policy, context_key, request.merge_context)
 
 
 @app.post("/suggest", response_model=SuggestionResponse)
@@ -58,6 +194,9 @@ async def suggest_command(request: SuggestionRequest) -> SuggestionResponse:
     """
     Generate a command suggestion based on natural language goal.
     
+    Identical requests are answered from a short-lived cache, and identical
+    requests that arrive while one is being generated wait for its result.
+    
     Args:
         request: Suggestion request with goal and context
         
@@ -70,52 +209,34 @@ async def suggest_command(request: SuggestionRequest) -> SuggestionResponse:
     # Use provided cwd or current directory
     cwd = request.cwd or os.getcwd()
     
-    # Collect context if not provided
-    if request.context is None:
-        context = context_collector.collect(cwd)
-    else:
-        # Merge provided context with collected context
-        collected_context = context_collector.collect(cwd)
-        context = {**collected_context, **request.context}
-    
-    # Add shell info if provided
-    if request.shell:
-        context["shell"] = request.shell
-    
     try:
-        # Get AI provider and generate suggestion
-        provider = get_provider()
-        raw_command = await provider.suggest(request.goal, context)
-        
-        if not raw_command or not raw_command.strip():
-            raise HTTPException(status_code=400, detail="No command generated")
-        
-        # Apply safety checks
-        command = raw_command.strip()
-        risk_score = safety.risk_score(command)
-        
-        # Apply dry-run rewriting if policy allows
-        if request.policy == "normal":
-            command = safety.rewrite_to_dry_run(command)
-        
-        # Generate explanation (simple for MVP)
-        explanation = f"Command to: {request.goal}"
+        key = _cache_key(request, cwd)
+        cached = _suggestion_cache.get(key) if key is not None else None
+        if cached is not None:
+            response = cached
+        elif key is None:
+            response = await _generate_suggestion(request, cwd, None)
+        else:
+            task = _inflight.get(key)
+            if task is None:
+                task = asyncio.create_task(_generate_suggestion(request, cwd, key))
+                _inflight[key] = task
+                task.add_done_callback(lambda _: _inflight.pop(key, None))
+            
+            # Shield the shared task so one client disconnecting does not
+            # cancel it for the others waiting on it
+            response = await asyncio.shield(task)
         
         # Log the suggestion
         audit_logger.log_suggestion(
             goal=request.goal,
-            command=command,
+            command=response.command,
             cwd=cwd,
             provider=config.ai_provider,
-            risk_score=risk_score,
+            risk_score=response.risk,
         )
         
-        return SuggestionResponse(
-            command=command,
-            explanation=explanation,
-            risk=risk_score,
-            alternatives=[],
-        )
+        return response
         
     except ProviderError as e:
         # Log the error
@@ -145,20 +266,87 @@ async def health_check():
 
 
 @app.get("/stats")
-async def get_stats():
+async def get_stats() -> Response:
     """Get usage statistics."""
-    return audit_logger.get_stats()
+    stats = audit_logger.get_stats()
+    stats["safety_cache"] = safety.cache_info()
+    
+    # Encoded with orjson when available; there is no response model for
+    # FastAPI to serialize this through
+    return Response(jsonutil.dumps(stats), media_type="application/json")
+
+
+def _bind_unix_socket() -> Optional[socket.socket]:
+    """
+    Bind the daemon's UNIX domain socket, if the platform supports one.
+    
+    Returns:
+        Bound socket, or None if UNIX sockets are unavailable or the socket
+        cannot be created (e.g. the path is too long or not writable), in
+        which case the daemon serves TCP only
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    
+    path = config.expanded_socket_path
+    sock = None
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        
+        # A socket file left behind by a previous daemon would make bind() fail
+        path.unlink(missing_ok=True)
+        
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(str(path))
+        os.chmod(path, 0o600)
+    except OSError as e:
+        print(  # noqa: T201
+            f"Warning: Could not bind UNIX socket {path}, serving TCP only: {e}",
+            file=sys.stderr,
+        )
+        if sock is not None:
+            sock.close()
+        return None
+    return sock
+
+
+# uvicorn[standard] installs uvloop everywhere except Windows, Cygwin and PyPy
+UVLOOP_SUPPORTED = (
+    sys.platform not in ("win32", "cygwin")
+    and platform.python_implementation() == "CPython"
+)
 
 
 def main():
-    """Run the FastAPI server."""
-    uvicorn.run(
+    """Run the FastAPI server on TCP and on the local UNIX socket."""
+    # Name the fast loop and HTTP parser explicitly, so a broken install
+    # fails at startup instead of silently falling back to asyncio and h11
+    server_config = uvicorn.Config(
         "ai_shell.server:app",
         host=config.ai_host,
         port=config.ai_port,
+        loop="uvloop" if UVLOOP_SUPPORTED else "asyncio",
+        http="httptools",
+        workers=1,
         reload=False,
         access_log=False,
     )
+    
+    # Bind TCP first: if the port is taken another daemon owns the socket too
+    sockets = [server_config.bind_socket()]
+    unix_socket = _bind_unix_socket()
+    if unix_socket is not None:
+        sockets.append(unix_socket)
+    
+    try:
+        uvicorn.Server(server_config).run(sockets=sockets)
+    finally:
+        # Not reached when uvicorn re-raises SIGTERM; a stale socket file is
+        # then removed by the next daemon before it binds
+        for sock in sockets:
+            sock.close()
+        if unix_socket is not None:
+            config.expanded_socket_path.unlink(missing_ok=True)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,225 @@
+"""Tests for audit logging."""
+
+import json
+import threading
+
+import pytest
+from ai_shell.audit import AuditLogger
+
+
+class TestAuditLogger:
+    """Test audit log writing, reading and rotation."""
+
+    @pytest.fixture(autouse=True)
+    def setup_logger(self, tmp_path):
+        """Set up a logger writing into a temporary directory."""
+        self.log_path = tmp_path / "audit.jsonl"
+        self.logger = AuditLogger(str(self.log_path), sync=True)
+        yield
+        self.logger.close()
+
+    def test_log_suggestion_round_trip(self):
+        """Test that logged suggestions can be read back."""
+        self.logger.log_suggestion("list files", "ls -la", "/tmp", "openai", risk_score=0.0)
+        self.logger.log_suggestion("show dir", "pwd", "/tmp", "ollama", approved=True, exit_code=0)
+
+        entries = self.logger.get_recent_entries(10)
+        assert [e["command"] for e in entries] == ["ls -la", "pwd"]
+        assert entries[1]["approved"] is True
+
+    def test_entry_encoding(self):
+        """Test that hand-packed lines are valid JSON with every field intact."""
+        goal = 'say "hi"\n\tcafé \\ ✓'
+        self.logger.log_suggestion(goal, "echo $HOME", "/tmp", "openai", True, 3, 0.25)
+        self.logger.log_error(goal, "boom", "/tmp")
+
+        suggestion, error = [
+            json.loads(line) for line in self.log_path.read_text(encoding="utf-8").splitlines()
+        ]
+        assert suggestion.pop("timestamp").endswith("Z")
+        assert suggestion == {
+            "goal": goal,
+            "command": "echo $HOME",
+            "cwd": "/tmp",
+            "provider": "openai",
+            "approved": True,
+            "exit_code": 3,
+            "risk_score": 0.25,
+        }
+        assert error["goal"] == goal
+        assert error["provider"] is None
+
+    def test_entry_with_surrogates(self):
+        """Test that strings that are not valid UTF-8 are logged escaped."""
+        cwd = "/tmp/caf\udce9"
+        self.logger.log_suggestion("list files", "ls", cwd, "openai")
+
+        line = self.log_path.read_text(encoding="utf-8")
+        assert "\\udce9" in line
+        assert json.loads(line)["cwd"] == cwd
+
+    def test_get_recent_entries_across_blocks(self, monkeypatch):
+        """Test reading the tail of a log spanning many read blocks."""
+        monkeypatch.setattr("ai_shell.audit.READ_BLOCK_SIZE", 64)
+        for i in range(50):
+            self.logger.log_suggestion(f"goal {i}", "ls", "/tmp", "openai")
+
+        entries = self.logger.get_recent_entries(3)
+        assert [e["goal"] for e in entries] == ["goal 47", "goal 48", "goal 49"]
+
+        entries = self.logger.get_recent_entries(100)
+        assert len(entries) == 50
+        assert entries[0]["goal"] == "goal 0"
+
+    def test_entries_written_immediately(self):
+        """Test that synchronous entries reach the file without a flush."""
+        self.logger.log_suggestion("list files", "ls", "/tmp", "openai", approved=False)
+        self.logger.log_error("list files", "boom", "/tmp", "openai")
+
+        lines = self.log_path.read_text(encoding="utf-8").splitlines()
+        assert json.loads(lines[0])["approved"] is False
+        assert json.loads(lines[1])["error"] == "boom"
+
+    def test_write_after_close_reopens_log(self):
+        """Test that the logger keeps working after its descriptor is closed."""
+        self.logger.log_error("list files", "boom", "/tmp", "openai")
+        self.logger.close()
+        self.logger.log_error("list files", "again", "/tmp", "openai")
+
+        lines = self.log_path.read_text(encoding="utf-8").splitlines()
+        assert [json.loads(line)["error"] for line in lines] == ["boom", "again"]
+
+    def test_rotation(self):
+        """Test that the log is rotated once it exceeds the size limit."""
+        self.logger.max_size_bytes = 200
+        for i in range(2):
+            self.logger.log_suggestion(f"goal {i}", "ls", "/tmp", "openai", approved=True)
+
+        backup_path = self.log_path.with_suffix(".jsonl.1")
+        assert backup_path.exists()
+        assert not self.log_path.exists()
+
+        # Writes continue to a fresh log after rotation
+        self.logger.log_suggestion("goal 2", "ls", "/tmp", "openai", approved=True)
+        entries = self.logger.get_recent_entries(10)
+        assert [e["goal"] for e in entries] == ["goal 2"]
+
+    def test_rotation_by_another_logger(self, monkeypatch):
+        """Test that a logger follows the log when another writer rotates it."""
+        monkeypatch.setattr("ai_shell.audit.REOPEN_CHECK_INTERVAL", 0.0)
+        other = AuditLogger(str(self.log_path), sync=True)
+        self.logger.log_suggestion("goal 0", "ls", "/tmp", "openai")
+
+        other.max_size_bytes = 200
+        for i in range(1, 3):
+            other.log_suggestion(f"goal {i}", "ls", "/tmp", "openai")
+        assert not self.log_path.exists()
+
+        # Our descriptor still points at the backup; the write must not
+        self.logger.log_suggestion("goal 3", "ls", "/tmp", "openai")
+        other.log_suggestion("goal 4", "ls", "/tmp", "openai")
+        other.close()
+
+        entries = self.logger.get_recent_entries(10)
+        assert [e["goal"] for e in entries] == ["goal 3", "goal 4"]
+
+        backup = self.log_path.with_suffix(".jsonl.1").read_text(encoding="utf-8")
+        assert [json.loads(line)["goal"] for line in backup.splitlines()] == [
+            "goal 0", "goal 1", "goal 2",
+        ]
+
+    def test_rotation_check_throttled(self, monkeypatch):
+        """Test that back-to-back writes do not re-check the log's inode."""
+        calls = []
+        monkeypatch.setattr("ai_shell.audit.os.fstat", lambda fd: calls.append(fd))
+        for i in range(3):
+            self.logger.log_suggestion(f"goal {i}", "ls", "/tmp", "openai")
+        assert calls == []
+
+    def test_get_stats(self):
+        """Test statistics over the audit log."""
+        self.logger.log_suggestion("a", "ls", "/tmp", "openai", approved=True)
+        self.logger.log_suggestion("b", "rm x", "/tmp", "openai", approved=False)
+        self.logger.log_error("c", "boom", "/tmp", "ollama")
+
+        stats = self.logger.get_stats()
+        assert stats["total_entries"] == 3
+        assert sorted(stats["providers_used"]) == ["ollama", "openai"]
+        assert stats["approval_rate"] == 0.5
+        assert stats["file_size_bytes"] > 0
+
+    def test_stats_shared_between_loggers(self):
+        """Test that statistics from several writers are merged, not overwritten."""
+        other = AuditLogger(str(self.log_path), sync=True)
+        self.logger.log_suggestion("a", "ls", "/tmp", "openai")
+        other.log_suggestion("b", "ls", "/tmp", "ollama", approved=True)
+
+        self.logger.close()
+        other.close()
+
+        stats = AuditLogger(str(self.log_path)).get_stats()
+        assert stats["total_entries"] == 2
+        assert stats["providers_used"] == ["ollama", "openai"]
+        assert stats["approval_rate"] == 1.0
+
+    def test_stats_rebuilt_from_log(self):
+        """Test that a missing stats file is rebuilt by scanning the log."""
+        self.logger.log_suggestion("a", "ls", "/tmp", "openai", approved=False)
+        self.logger.close()
+        self.logger.stats_path.unlink()
+
+        stats = AuditLogger(str(self.log_path)).get_stats()
+        assert stats["total_entries"] == 1
+        assert stats["approval_rate"] == 0.0
+
+    def test_stats_rebuilt_after_log_truncated(self):
+        """Test that stats saved for a longer log are rebuilt from the log."""
+        for goal in ("a", "b", "c"):
+            self.logger.log_suggestion(goal, "ls", "/tmp", "openai", approved=True)
+        self.logger.close()
+
+        first_line = self.log_path.read_text(encoding="utf-8").splitlines(keepends=True)[0]
+        self.log_path.write_text(first_line, encoding="utf-8")
+        assert AuditLogger(str(self.log_path)).get_stats()["total_entries"] == 1
+
+        self.log_path.unlink()
+        assert AuditLogger(str(self.log_path)).get_stats()["total_entries"] == 0
+
+    def test_stats_saved_concurrently(self, monkeypatch):
+        """Test that loggers saving stats at the same time keep every increment."""
+        monkeypatch.setattr("ai_shell.audit.STATS_SAVE_INTERVAL", 1)
+        loggers = [self.logger] + [AuditLogger(str(self.log_path), sync=True) for _ in range(3)]
+
+        def log_entries(logger):
+            for i in range(25):
+                logger.log_suggestion(f"goal {i}", "ls", "/tmp", "openai")
+
+        threads = [threading.Thread(target=log_entries, args=(logger,)) for logger in loggers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert AuditLogger(str(self.log_path)).get_stats()["total_entries"] == 100
+
+    def test_background_writer(self):
+        """Test that queued entries are written by the background writer."""
+        logger = AuditLogger(str(self.log_path))
+        for i in range(20):
+            logger.log_suggestion(f"goal {i}", "ls", "/tmp", "openai")
+
+        # Reads wait for the queue to drain
+        entries = logger.get_recent_entries(20)
+        assert len(entries) == 20
+        assert logger.get_stats()["total_entries"] == 20
+
+        logger.log_error("goal", "boom", "/tmp")
+        logger.close()
+
+        lines = self.log_path.read_text(encoding="utf-8").splitlines()
+        assert len(lines) == 21
+
+    def test_missing_log(self):
+        """Test reading from a logger that has not written anything."""
+        assert self.logger.get_recent_entries(5) == []
+        assert self.logger.get_stats()["total_entries"] == 0
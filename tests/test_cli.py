@@ -0,0 +1,58 @@
+"""Tests for the CLI's daemon calls."""
+
+import httpx
+import pytest
+from unittest.mock import MagicMock, patch
+from ai_shell import cli
+
+
+class TestCallDaemon:
+    """Test that the daemon is started only when it cannot be reached."""
+
+    @pytest.fixture(autouse=True)
+    def setup_client(self):
+        """Patch the shared HTTP client and the daemon launcher."""
+        self.client = MagicMock()
+        with patch.object(cli, "_http_client", return_value=self.client), \
+                patch.object(cli, "_start_daemon", return_value=True) as start, \
+                patch.object(cli, "_wait_for_daemon", return_value=True) as wait:
+            self.start_daemon = start
+            self.wait_for_daemon = wait
+            yield
+
+    def _response(self, command):
+        """Build a successful /suggest response."""
+        response = MagicMock(status_code=200)
+        response.json.return_value = {"command": command}
+        return response
+
+    def test_daemon_running(self):
+        """Test that a running daemon is called once, without a health check."""
+        self.client.post.return_value = self._response("ls -la")
+
+        assert cli.call_daemon("list files") == "ls -la"
+        self.client.post.assert_called_once()
+        self.client.get.assert_not_called()
+        self.start_daemon.assert_not_called()
+
+    def test_daemon_started_on_connect_error(self):
+        """Test that a refused connection starts the daemon and retries once."""
+        self.client.post.side_effect = [
+            httpx.ConnectError("refused"),
+            self._response("ls -la"),
+        ]
+
+        assert cli.call_daemon("list files") == "ls -la"
+        self.start_daemon.assert_called_once()
+        self.wait_for_daemon.assert_called_once()
+        assert self.client.post.call_count == 2
+        assert self.client.post.call_args_list[0] == self.client.post.call_args_list[1]
+
+    def test_daemon_fails_to_start(self, capsys):
+        """Test that no retry is made when the daemon does not come up."""
+        self.client.post.side_effect = httpx.ConnectError("refused")
+        self.wait_for_daemon.return_value = False
+
+        assert cli.call_daemon("list files") is None
+        self.client.post.assert_called_once()
+        assert "Could not start AI Shell daemon" in capsys.readouterr().err
@@ -0,0 +1,71 @@
+"""Tests for configuration loading."""
+
+import os
+from dataclasses import fields
+
+import pytest
+from ai_shell.config import Config, load_config
+
+
+class TestLoadConfig:
+    """Test layering of .env and environment variables."""
+
+    @pytest.fixture(autouse=True)
+    def setup_env(self, monkeypatch, tmp_path):
+        """Run from an empty directory with no settings in the environment."""
+        for field in fields(Config):
+            monkeypatch.delenv(field.name.upper(), raising=False)
+            monkeypatch.delenv(field.name, raising=False)
+        monkeypatch.chdir(tmp_path)
+        self.env_path = tmp_path / ".env"
+
+    def test_defaults(self):
+        """Test that defaults apply without .env or environment variables."""
+        assert load_config() == Config()
+
+    def test_env_file(self):
+        """Test that settings are read from .env and coerced to their types."""
+        self.env_path.write_text("AI_PROVIDER=ollama\nAI_PORT=9000\n")
+
+        config = load_config()
+        assert config.ai_provider == "ollama"
+        assert config.ai_port == 9000
+
+    def test_environment_overrides_env_file(self, monkeypatch):
+        """Test that real environment variables take precedence over .env."""
+        self.env_path.write_text("AI_PORT=9000\nOPENAI_MODEL=from-file\n")
+        monkeypatch.setenv("AI_PORT", "9100")
+
+        config = load_config()
+        assert config.ai_port == 9100
+        assert config.openai_model == "from-file"
+
+    def test_names_case_insensitive(self, monkeypatch):
+        """Test that lower-case names are matched like upper-case ones."""
+        self.env_path.write_text("ai_provider=ollama\n")
+        monkeypatch.setenv("ai_port", "9001")
+
+        config = load_config()
+        assert config.ai_provider == "ollama"
+        assert config.ai_port == 9001
+
+    def test_env_file_not_exported(self):
+        """Test that .env values stay out of os.environ."""
+        self.env_path.write_text("OPENAI_API_KEY=secret\n")
+
+        assert load_config().openai_api_key == "secret"
+        assert "OPENAI_API_KEY" not in os.environ
+
+    def test_invalid_port(self, monkeypatch):
+        """Test that a non-integer port names the variable."""
+        monkeypatch.setenv("AI_PORT", "eighty")
+
+        with pytest.raises(ValueError, match="AI_PORT"):
+            load_config()
+
+    def test_invalid_provider(self):
+        """Test that an unknown provider is rejected."""
+        self.env_path.write_text("AI_PROVIDER=gemini\n")
+
+        with pytest.raises(ValueError, match="AI_PROVIDER"):
+            load_config()
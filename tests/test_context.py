@@ -0,0 +1,93 @@
+"""Tests for context collection."""
+
+import shutil
+import subprocess
+
+import pytest
+from ai_shell import context
+from ai_shell.context import ContextCollector
+
+
+def _git(cwd, *args):
+    """Run git in cwd with a throwaway identity and return its output."""
+    return subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+        cwd=cwd, check=True, capture_output=True, text=True,
+    ).stdout
+
+
+class TestContextCollector:
+    """Test context collection and its per-directory cache."""
+    
+    @pytest.fixture(autouse=True)
+    def setup_collector(self, tmp_path):
+        """Set up a collector over a temporary directory."""
+        self.cwd = tmp_path
+        (tmp_path / "a.txt").write_text("a")
+        self.collector = ContextCollector()
+    
+    def test_collect(self):
+        """Test the collected fields."""
+        context = self.collector.collect(str(self.cwd))
+        assert context["cwd"] == str(self.cwd)
+        assert context["files_sample"] == ["a.txt"]
+        assert "shell" in context
+        assert "os" in context
+    
+    def test_collect_cached(self, monkeypatch):
+        """Test that an unchanged directory is not scanned again."""
+        first = self.collector.collect(str(self.cwd))
+        monkeypatch.setattr(self.collector, "_get_file_listing", lambda cwd: pytest.fail("rescanned"))
+        second = self.collector.collect(str(self.cwd))
+        assert second == first
+        
+        # Callers get their own dict, so mutating one cannot poison the cache
+        second["shell"] = "fish"
+        assert self.collector.collect(str(self.cwd))["shell"] == first["shell"]
+    
+    def test_cache_invalidated_by_directory_change(self):
+        """Test that adding a file forces a fresh scan."""
+        self.collector.collect(str(self.cwd))
+        (self.cwd / "b.txt").write_text("b")
+        assert self.collector.collect(str(self.cwd))["files_sample"] == ["a.txt", "b.txt"]
+    
+    def test_cache_expires(self, monkeypatch):
+        """Test that cached context is only reused within the TTL."""
+        collector = ContextCollector(cache_ttl=0)
+        collector.collect(str(self.cwd))
+        
+        calls = []
+        monkeypatch.setattr(collector, "_get_file_listing", lambda cwd: calls.append(cwd) or [])
+        collector.collect(str(self.cwd))
+        assert calls == [str(self.cwd)]
+    
+    def test_git_root_found_after_init(self):
+        """Test that a directory is searched again until it becomes a repository."""
+        sub = self.cwd / "sub"
+        sub.mkdir()
+        assert context._find_git_root(str(sub)) is None
+        
+        (self.cwd / ".git").mkdir()
+        assert context._find_git_root(str(sub)) == str(self.cwd)
+    
+    @pytest.mark.skipif(shutil.which("git") is None, reason="git not installed")
+    def test_format_status_matches_git(self):
+        """Test that pygit2 status output matches git status --porcelain -b."""
+        pygit2 = pytest.importorskip("pygit2")
+        _git(self.cwd, "init", "-q", "-b", "main")
+        (self.cwd / "b.txt").write_text("b")
+        _git(self.cwd, "add", "a.txt", "b.txt")
+        _git(self.cwd, "commit", "-q", "-m", "init")
+        
+        (self.cwd / "a.txt").write_text("changed")
+        (self.cwd / "c.txt").write_text("c")
+        _git(self.cwd, "add", "c.txt")
+        (self.cwd / "b.txt").unlink()
+        (self.cwd / "new").mkdir()
+        (self.cwd / "new" / "x.txt").write_text("x")
+        (self.cwd / "new" / "y.txt").write_text("y")
+        (self.cwd / "z.txt").write_text("z")
+        
+        expected = _git(self.cwd, "status", "--porcelain", "-b").rstrip("\n")
+        assert "?? new/" in expected
+        assert context._format_status(pygit2.Repository(str(self.cwd))) == expected
@@ -1,7 +1,9 @@
 """Tests for provider selection and interfaces."""
 
+import json
+
 import pytest
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 from ai_shell.provider import OpenAIProvider, OllamaProvider, ProviderError
 
 
@@ -50,12 +52,11 @@ class TestProviderSelection:
         
         with patch("httpx.AsyncClient") as mock_client:
             # Create a mock response object
-            mock_response_obj = AsyncMock()
-            mock_response_obj.json = AsyncMock(return_value=mock_response)
-            mock_response_obj.raise_for_status = AsyncMock(return_value=None)
+            mock_response_obj = MagicMock()
+            mock_response_obj.aread = AsyncMock(return_value=json.dumps(mock_response).encode())
             
             # Set up the mock client
-            mock_client.return_value.__aenter__.return_value.post = AsyncMock(return_value=mock_response_obj)
+            mock_client.return_value.post = AsyncMock(return_value=mock_response_obj)
             
             result = await provider.suggest("list files", {"cwd": "/tmp"})
             assert result == "ls -la"
@@ -71,15 +72,38 @@ class TestProviderSelection:
         
         with patch("httpx.AsyncClient") as mock_client:
             # Create a mock response object
-            mock_response_obj = AsyncMock()
-            mock_response_obj.json = AsyncMock(return_value=mock_response)
-            mock_response_obj.raise_for_status = AsyncMock(return_value=None)
+            mock_response_obj = MagicMock()
+            mock_response_obj.aread = AsyncMock(return_value=json.dumps(mock_response).encode())
             
             # Set up the mock client
-            mock_client.return_value.__aenter__.return_value.post = AsyncMock(return_value=mock_response_obj)
+            mock_client.return_value.post = AsyncMock(return_value=mock_response_obj)
             
             result = await provider.suggest("find large log files", {"cwd": "/tmp"})
             assert result == "find . -name '*.log' -size +10M"
+            
+            # The request body is sent pre-encoded
+            payload = json.loads(mock_client.return_value.post.call_args.kwargs["content"])
+            assert payload["model"] == "llama2"
+            assert payload["options"]["num_predict"] == 50
+            assert payload["prompt"].endswith("Goal: find large log files\nCurrent directory: /tmp")
+    
+    @pytest.mark.asyncio
+    async def test_provider_reuses_http_client(self):
+        """Test that one HTTP client is shared across calls and closed by aclose."""
+        provider = OllamaProvider("http://localhost:11434", "llama2")
+        
+        with patch("httpx.AsyncClient") as mock_client:
+            mock_response_obj = MagicMock()
+            mock_response_obj.aread = AsyncMock(return_value=b'{"response": "ls"}')
+            mock_client.return_value.post = AsyncMock(return_value=mock_response_obj)
+            mock_client.return_value.aclose = AsyncMock()
+            
+            await provider.suggest("list files", {})
+            await provider.suggest("list files again", {})
+            assert mock_client.call_count == 1
+            
+            await provider.aclose()
+            mock_client.return_value.aclose.assert_awaited_once()
     
     def test_clean_command_with_code_fences(self):
         """Test command cleaning with code fences."""
@@ -93,8 +117,16 @@ class TestProviderSelection:
         code_block = "```bash\nls -la\necho done\n```"
         assert provider._clean_command(code_block) == "ls -la"
         
+        # Test code block with blank lines before the command
+        assert provider._clean_command("```sh\n\n  ls -la\n```") == "ls -la"
+        
+        # Test fences with no command line between them
+        assert provider._clean_command("```ls -la\n```") == "ls -la"
+        assert provider._clean_command("```bash\n```\nls") == "ls"
+        
         # Test plain command
         assert provider._clean_command("ls -la") == "ls -la"
+        assert provider._clean_command("  ls -la\nexplanation") == "ls -la"
     
     def test_build_user_prompt(self):
         """Test user prompt building."""
@@ -114,6 +146,10 @@ class TestProviderSelection:
         assert "Shell: zsh" in prompt
         assert "Git status: On branch main" in prompt
         assert "Files in directory: file1.txt, file2.py" in prompt
+        
+        # Missing or empty context entries are left out entirely
+        prompt = provider._build_user_prompt("list files", {"cwd": "/tmp", "git": None})
+        assert prompt == "Goal: list files\nCurrent directory: /tmp"
     
     def test_build_system_prompt(self):
         """Test system prompt building."""
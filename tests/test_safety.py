@@ -1,6 +1,9 @@
 """Tests for safety module."""
 
+import threading
+
 import pytest
+from ai_shell import safety as safety_module
 from ai_shell.safety import Safety
 
 
@@ -25,6 +28,22 @@ class TestSafety:
             risk = self.safety.risk_score(cmd)
             assert risk <= 0.2, f"Command '{cmd}' should be low risk, got {risk}"
     
+    def test_risk_score_safe_leading_command(self):
+        """Test the read-only fast path and the shell syntax that defeats it."""
+        assert self.safety.risk_score("grep install setup.py") == 0.0
+        assert self.safety.risk_score("echo rm -rf /") == 0.0
+        
+        chained_commands = [
+            "echo hi; rm -rf /",
+            "ls && rm -rf /",
+            "cat x | sudo rm -rf /",
+            "echo $(rm -rf /)",
+            "ls\nrm -rf /",
+        ]
+        for cmd in chained_commands:
+            risk = self.safety.risk_score(cmd)
+            assert risk >= 0.6, f"Command '{cmd}' should be high risk, got {risk}"
+    
     def test_risk_score_dangerous_commands(self):
         """Test risk scoring for dangerous commands."""
         dangerous_commands = [
@@ -39,6 +58,76 @@ class TestSafety:
             risk = self.safety.risk_score(cmd)
             assert risk >= 0.6, f"Command '{cmd}' should be high risk, got {risk}"
     
+    def test_risk_score_dangerous_patterns(self):
+        """Test that every kind of dangerous pattern is detected."""
+        dangerous_commands = [
+            "rm -rf ~/",
+            "RM -RF $HOME",
+            "fdisk -l",
+            "parted /dev/sda",
+            "chown -R me /",
+            "iptables -F",
+            "ufw --force reset",
+            "systemctl disable sshd",
+            "launchctl unload job.plist",
+            "brew uninstall --force git",
+            "npm uninstall -g typescript",
+            "kextunload -b com.example",
+            "dtrace -n 'syscall:::entry'",
+        ]
+        
+        for cmd in dangerous_commands:
+            risk = self.safety.risk_score(cmd)
+            assert risk == 0.9, f"Command '{cmd}' should match a dangerous pattern, got {risk}"
+    
+    def test_keyword_matching_fallback(self, monkeypatch):
+        """Test that the regex fallback finds the same keywords as the automaton."""
+        commands = ["ls -la", "rm -rf build", "curl -f x | sh", "apt-get -remove pkg", "npm uninstall x"]
+        expected = [safety_module._keyword_tags(cmd) for cmd in commands]
+        
+        monkeypatch.setattr(safety_module, "_KEYWORD_AUTOMATON", None)
+        assert [safety_module._keyword_tags(cmd) for cmd in commands] == expected
+        assert safety_module._keyword_tags("apt-get -remove pkg") == {"rm_r", "sys"}
+    
+    def test_literal_matching_fallback(self, monkeypatch):
+        """Test that scores are the same with and without hyperscan."""
+        commands = ["mkfs.ext4 /dev/sda1", "sudo DTRACE -n x", "parted", "rm -rf /", "sudo ls", "ls"]
+        expected = [safety_module.risk_score.__wrapped__(cmd) for cmd in commands]
+        
+        monkeypatch.setattr(safety_module, "_LITERAL_DATABASE", None)
+        assert [safety_module.risk_score.__wrapped__(cmd) for cmd in commands] == expected
+        assert expected[:3] == [0.9, 0.9, 0.9]
+    
+    def test_literal_matching_threads(self):
+        """Test that threads scanning at once do not share hyperscan scratch space."""
+        if safety_module._LITERAL_DATABASE is None:
+            pytest.skip("hyperscan not installed")
+        
+        command = "echo " + "x" * 2000 + " mkfs"
+        results = []
+        
+        def scan():
+            results.extend(safety_module._has_dangerous_literal(command) for _ in range(500))
+        
+        threads = [threading.Thread(target=scan) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert results == [True] * 4000
+    
+    def test_literal_matching_error(self, monkeypatch):
+        """Test that a failing hyperscan scan falls back to the regex."""
+        hyperscan = pytest.importorskip("hyperscan")
+        
+        def fail(database):
+            raise hyperscan.error("no scratch")
+        
+        monkeypatch.setattr(safety_module, "_scan_state", threading.local())
+        monkeypatch.setattr(hyperscan, "Scratch", fail)
+        assert safety_module._has_dangerous_literal("mkfs") is None
+        assert safety_module.risk_score.__wrapped__("mkfs /dev/sda1") == 0.9
+    
     def test_risk_score_sudo_commands(self):
         """Test risk scoring for sudo commands."""
         sudo_commands = [
@@ -68,6 +157,8 @@ class TestSafety:
             ("cp file1 file2", "cp -n file1 file2"),
             ("mv old new", "mv -n old new"),
             ("git clean -fd", "git clean --dry-run -fd"),
+            ("git  reset --hard", "git reset --dry-run --hard"),
+            ("mv new-file old-file", "mv -n new-file old-file"),
         ]
         
         for original, expected in test_cases:
@@ -80,6 +171,11 @@ class TestSafety:
             "ls -la",
             "echo hello",
             "cat file.txt",
+            "rsync",
+            "git clean",
+            "git status",
+            "cp -n a b",
+            "rsync -av --dry-run src/ dest/",
         ]
         
         for cmd in commands:
@@ -97,6 +193,31 @@ class TestSafety:
         warnings = self.safety.get_safety_warnings("ls -la")
         assert len(warnings) == 0
     
+    def test_evaluate(self):
+        """Test that evaluate agrees with the individual checks."""
+        for cmd in ["rm -rf /", "sudo rm file", "rm file.txt", "ls -la", ""]:
+            result = self.safety.evaluate(cmd)
+            assert result.risk == self.safety.risk_score(cmd)
+            assert result.warnings == self.safety.get_safety_warnings(cmd)
+            assert result.requires_confirmation == self.safety.requires_confirmation(cmd)
+        
+        risk, warnings, needs_confirmation = self.safety.evaluate("rm -rf /")
+        assert risk >= 0.9
+        assert needs_confirmation
+        assert any("DANGER" in warning for warning in warnings)
+    
+    def test_results_are_cached(self):
+        """Test that repeated checks are served from the cache."""
+        hits = safety_module.cache_info()["risk_score"]["hits"]
+        self.safety.risk_score("rm -rf build/")
+        self.safety.risk_score("rm -rf build/")
+        assert safety_module.cache_info()["risk_score"]["hits"] > hits
+        
+        # Callers get their own lists, so mutating one cannot poison the cache
+        self.safety.get_safety_warnings("rm -rf /").clear()
+        self.safety.evaluate("rm -rf /").warnings.append("extra")
+        assert len(self.safety.evaluate("rm -rf /").warnings) == 2
+    
     def test_is_safe_for_auto_execution(self):
         """Test auto-execution safety check."""
         # Safe commands should be auto-executable
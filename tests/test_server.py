@@ -1,8 +1,13 @@
 """Tests for FastAPI server."""
 
+import asyncio
+import socket
+
 import pytest
 from fastapi.testclient import TestClient
 from unittest.mock import patch, AsyncMock
+from ai_shell import server
+from ai_shell.config import Config
 from ai_shell.server import app
 
 
@@ -12,6 +17,7 @@ class TestServer:
     def setup_method(self):
         """Set up test fixtures."""
         self.client = TestClient(app)
+        server._suggestion_cache.clear()
     
     def test_health_endpoint(self):
         """Test health check endpoint."""
@@ -27,6 +33,8 @@ class TestServer:
         assert response.status_code == 200
         data = response.json()
         assert isinstance(data, dict)
+        assert "hits" in data["safety_cache"]["risk_score"]
+        assert response.headers["content-type"] == "application/json"
     
     @patch("ai_shell.server.get_provider")
     def test_suggest_endpoint_success(self, mock_get_provider):
@@ -69,6 +77,122 @@ class TestServer:
         response = self.client.post("/suggest", json=payload)
         assert response.status_code == 500
     
+    @patch("ai_shell.server.context_collector")
+    @patch("ai_shell.server.get_provider")
+    def test_suggest_endpoint_without_merge(self, mock_get_provider, mock_collector):
+        """Test that provided context is used as is when merging is disabled."""
+        mock_provider = AsyncMock()
+        mock_provider.suggest.return_value = "ls -la"
+        mock_get_provider.return_value = mock_provider
+        
+        payload = {
+            "goal": "list files",
+            "context": {"cwd": "/srv", "files_sample": ["main.py"]},
+            "merge_context": False,
+        }
+        
+        response = self.client.post("/suggest", json=payload)
+        assert response.status_code == 200
+        mock_collector.collect.assert_not_called()
+        
+        context = mock_provider.suggest.call_args[0][1]
+        assert context == {"cwd": "/srv", "files_sample": ["main.py"]}
+    
+    @patch("ai_shell.server.get_provider")
+    def test_suggest_endpoint_cached(self, mock_get_provider):
+        """Test that a repeated request is answered without the provider."""
+        mock_provider = AsyncMock()
+        mock_provider.suggest.return_value = "ls -la"
+        mock_get_provider.return_value = mock_provider
+        
+        payload = {"goal": "list files", "cwd": "/tmp", "shell": "zsh"}
+        first = self.client.post("/suggest", json=payload)
+        second = self.client.post("/suggest", json=payload)
+        assert first.json() == second.json()
+        mock_provider.suggest.assert_called_once()
+        
+        # A different policy is a different request
+        self.client.post("/suggest", json={**payload, "policy": "strict"})
+        assert mock_provider.suggest.call_count == 2
+    
+    @patch("ai_shell.server.get_provider")
+    def test_suggest_endpoint_uncacheable_context(self, mock_get_provider):
+        """Test that a context the cache key cannot encode is served uncached."""
+        mock_provider = AsyncMock()
+        mock_provider.suggest.return_value = "ls -la"
+        mock_get_provider.return_value = mock_provider
+        
+        # Wider than the 64-bit integers orjson encodes
+        payload = {"goal": "list files", "cwd": "/tmp", "context": {"inode": 2 ** 70}}
+        for _ in range(2):
+            response = self.client.post("/suggest", json=payload)
+            assert response.status_code == 200
+            assert response.json()["command"] == "ls -la"
+        assert mock_provider.suggest.call_count == 2
+    
+    @pytest.mark.asyncio
+    @patch("ai_shell.server.get_provider")
+    async def test_suggest_concurrent_requests_coalesced(self, mock_get_provider):
+        """Test that identical concurrent requests share one provider call."""
+        async def slow_suggest(goal, context):
+            await asyncio.sleep(0.05)
+            return "ls -la"
+        
+        mock_provider = AsyncMock()
+        mock_provider.suggest.side_effect = slow_suggest
+        mock_get_provider.return_value = mock_provider
+        
+        request = server.SuggestionRequest(goal="list files", cwd="/tmp")
+        responses = await asyncio.gather(
+            *(server.suggest_command(request) for _ in range(3))
+        )
+        assert [r.command for r in responses] == ["ls -la"] * 3
+        mock_provider.suggest.assert_called_once()
+        assert not server._inflight
+    
+    def test_provider_cached(self, monkeypatch):
+        """Test that one provider is shared by requests and closed on shutdown."""
+        monkeypatch.setattr(server, "config", Config(ai_provider="ollama"))
+        server._create_provider.cache_clear()
+        
+        provider = server.get_provider()
+        assert server.get_provider() is provider
+        
+        with patch.object(provider, "aclose", new_callable=AsyncMock) as mock_aclose:
+            with TestClient(app):
+                pass
+            mock_aclose.assert_awaited_once()
+        server._create_provider.cache_clear()
+    
+    def test_shutdown_closes_audit_log(self):
+        """Test that queued audit entries are written when the app shuts down."""
+        with patch.object(server.audit_logger, "close") as mock_close:
+            with TestClient(app):
+                mock_close.assert_not_called()
+            mock_close.assert_called_once()
+    
+    @pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="no UNIX sockets")
+    def test_bind_unix_socket(self, monkeypatch, tmp_path):
+        """Test that the daemon's UNIX socket is private to the user."""
+        path = tmp_path / "sock"
+        monkeypatch.setattr(server, "config", Config(ai_socket_path=str(path)))
+        
+        sock = server._bind_unix_socket()
+        try:
+            assert sock is not None
+            assert path.stat().st_mode & 0o777 == 0o600
+        finally:
+            sock.close()
+    
+    @pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="no UNIX sockets")
+    def test_bind_unix_socket_failure(self, monkeypatch, tmp_path, capsys):
+        """Test that an unusable socket path leaves the daemon on TCP only."""
+        path = tmp_path / ("x" * 200) / "sock"
+        monkeypatch.setattr(server, "config", Config(ai_socket_path=str(path)))
+        
+        assert server._bind_unix_socket() is None
+        assert "serving TCP only" in capsys.readouterr().err
+    
     def test_suggest_endpoint_missing_goal(self):
         """Test suggestion endpoint with missing goal."""
         payload = {}